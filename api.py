@@ -4,6 +4,7 @@ warnings.filterwarnings("ignore", message="numpy.dtype size changed")
 warnings.filterwarnings("ignore", message="numpy.ufunc size changed")
 
 from fastapi import FastAPI, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import json
@@ -42,6 +43,7 @@ class BatchRequest(BaseModel):
 # --- Endpoints ---
 
 import uuid
+import threading
 from fastapi import BackgroundTasks
 import psutil
 
@@ -49,6 +51,7 @@ import psutil
 # --- Global State ---
 BATCH_JOBS = {}
 SINGLE_JOBS = {}  # Store full results for single variant analysis
+BATCH_UPDATED = threading.Condition()  # notified whenever any batch job changes
 
 # --- Models ---
 class BatchResponse(BaseModel):
@@ -91,7 +94,8 @@ def process_batch_task(batch_id: str, variants: List[VariantRequest]):
     """
     try:
         BATCH_JOBS[batch_id]["status"] = "processing"
-        results = []
+        # Rows are appended as they finish, so streams can forward each one
+        results = BATCH_JOBS[batch_id]["results"]
         
         for i, v in enumerate(variants):
             try:
@@ -123,14 +127,18 @@ def process_batch_task(batch_id: str, variants: List[VariantRequest]):
                 })
             
             # Update progress
-            BATCH_JOBS[batch_id]["processed"] = i + 1
+            with BATCH_UPDATED:
+                BATCH_JOBS[batch_id]["processed"] = i + 1
+                BATCH_UPDATED.notify_all()
             
-        BATCH_JOBS[batch_id]["results"] = results
         BATCH_JOBS[batch_id]["status"] = "completed"
         
     except Exception as e:
         BATCH_JOBS[batch_id]["status"] = "failed"
         BATCH_JOBS[batch_id]["error"] = str(e)
+    finally:
+        with BATCH_UPDATED:
+            BATCH_UPDATED.notify_all()
 
 # --- Endpoints ---
 
@@ -367,6 +375,38 @@ def get_batch_status(batch_id: str):
     
     return BATCH_JOBS[batch_id]
 
+@app.get("/batch-stream/{batch_id}")
+def stream_batch_events(batch_id: str):
+    """
+    Stream a batch as Server-Sent Events: one `result` event per finished
+    variant as soon as it is scored, then a final `done` event carrying the
+    full job record. Wakes on job updates rather than polling.
+    """
+    if batch_id not in BATCH_JOBS:
+        raise HTTPException(status_code=404, detail="Batch ID not found")
+
+    def events():
+        job = BATCH_JOBS[batch_id]
+        sent = 0
+        while True:
+            with BATCH_UPDATED:
+                BATCH_UPDATED.wait_for(
+                    lambda: len(job["results"]) > sent or job["status"] in ["completed", "failed"],
+                    timeout=15)
+                new_rows = job["results"][sent:]
+                finished = job["status"] in ["completed", "failed"]
+            for row in new_rows:
+                sent += 1
+                yield f"event: result\ndata: {json.dumps({'processed': sent, 'total': job['total'], 'result': row})}\n\n"
+            if finished:
+                yield f"event: done\ndata: {json.dumps(job)}\n\n"
+                return
+            if not new_rows:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
 @app.get("/system-status")
 def get_system_status():
     """
@@ -499,7 +499,7 @@ def fetch_genomic_sequence(chrom: str, start: int, end: int, force_live: bool =
         chrom = f"chr{chrom}"
     url = f"{UCSC_API}/getData/sequence?genome=hg38&chrom={chrom}&start={start}&end={end}"
     try:
-        resp = requests.get(url, timeout=15, headers=HEADERS)
+        resp = SESSION.get(url, timeout=15)
         if resp.status_code == 200:
             data = resp.json()
             seq = data.get("dna", "").upper()
@@ -622,7 +622,7 @@ def fetch_mygene_info(gene_symbol):
     """
     url = f"https://mygene.info/v3/query?q=symbol:{gene_symbol}&species=human&fields=symbol,name,summary,genomic_pos,type_of_gene,alias"
     try:
-        resp = requests.get(url, timeout=5)
+        resp = SESSION.get(url, timeout=5)
         if resp.status_code == 200:
             data = resp.json()
             if data.get("hits"):
@@ -664,7 +664,7 @@ def fetch_myvariant_info(chrom, pos, ref, alt):
     }
     
     try:
-        resp = requests.get(url, params=params, timeout=5)
+        resp = SESSION.get(url, params=params, timeout=5)
         if resp.status_code == 200:
             data = resp.json()
             if data.get("hits"):
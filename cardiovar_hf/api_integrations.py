@@ -10,6 +10,9 @@ from typing import Optional, Dict, Any, List
 GNOMAD_API = "https://gnomad.broadinstitute.org/api"
 ENSEMBL_API = "https://rest.ensembl.org"
 
+# Global HTTP session for connection reuse (keep-alive across calls and batch workers)
+SESSION = requests.Session()
+
 def fetch_gnomad_frequency(chrom: str, pos: int, ref: str, alt: str) -> Optional[float]:
     """
     Fetch real allele frequency from gnomAD v4.
@@ -45,7 +48,7 @@ def fetch_gnomad_frequency(chrom: str, pos: int, ref: str, alt: str) -> Optional
         
         variables = {"variantId": variant_id}
         
-        response = requests.post(
+        response = SESSION.post(
             GNOMAD_API,
             json={"query": query, "variables": variables},
             timeout=10
@@ -80,7 +83,7 @@ def fetch_ensembl_gene(gene_symbol: str) -> Optional[Dict[str, Any]]:
         url = f"{ENSEMBL_API}/lookup/symbol/homo_sapiens/{gene_symbol}"
         headers = {"Content-Type": "application/json"}
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = SESSION.get(url, headers=headers, timeout=10)
         
         if response.status_code == 200:
             gene_data = response.json()
@@ -92,7 +95,7 @@ def fetch_ensembl_gene(gene_symbol: str) -> Optional[Dict[str, Any]]:
             protein_data = None
             if gene_data.get("biotype") == "protein_coding":
                 protein_url = f"{ENSEMBL_API}/overlap/id/{gene_id}?feature=protein_feature"
-                protein_response = requests.get(protein_url, headers=headers, timeout=10)
+                protein_response = SESSION.get(protein_url, headers=headers, timeout=10)
                 if protein_response.status_code == 200:
                     protein_data = protein_response.json()
             
@@ -172,7 +175,7 @@ def fetch_ucsc_phylop(chrom: str, start: int, end: int) -> Optional[list]:
             "end": end
         }
         
-        response = requests.get(base_url, params=params, timeout=15)
+        response = SESSION.get(base_url, params=params, timeout=15)
         
         if response.status_code == 200:
             data = response.json()
@@ -232,7 +235,7 @@ def fetch_gtex_expression(gene_symbol: str) -> Optional[List[Dict[str, Any]]]:
         
         headers = {"Content-Type": "application/json"}
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = SESSION.get(url, params=params, headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -295,7 +298,7 @@ def fetch_genomic_sequence(chrom: str, start: int, end: int) -> Optional[str]:
             "end": end
         }
         
-        response = requests.get(base_url, params=params, timeout=30)
+        response = SESSION.get(base_url, params=params, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
@@ -1,14 +1,22 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # headless server: skip backend probing
 import matplotlib.pyplot as plt
-import seaborn as sns
-import io
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import Rectangle
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import json
 import os
+import io
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import the variant engine directly (no API needed)
 from variant_engine import compute_variant_impact
+from vcf_parser import BATCH_DTYPES, read_batch_csv
 
 # Load data files
 def load_gene_annotations():
@@ -30,6 +38,20 @@ st.set_page_config(
 )
 
 # --- Helper Functions ---
+CARDIO_TISSUES = r'Heart|Aorta|Coronary'
+BATCH_WORKERS = 8
+
+@st.cache_resource
+def _init_theme():
+    """Process-wide matplotlib style, applied once rather than per figure."""
+    plt.rcParams.update({
+        "axes.spines.top": False,
+        "axes.spines.right": False,
+        "figure.autolayout": True,  # tight_layout at draw time
+    })
+
+_init_theme()
+
 def get_gene_annotation(gene_symbol):
     for record in GENE_DATA:
         if record["symbol"].upper() == gene_symbol.upper():
@@ -40,56 +62,199 @@ def get_related_data(chrom, pos, ref, alt):
     key = f"{chrom}:{pos}:{ref}:{alt}"
     return RELATED_DATA.get(key, [])
 
-def plot_deltas_from_data(data, chrom, pos, ref, alt, line_color, highlight_color):
+def payload_digest(data):
+    """Stable hash of a variant-engine result, used as the figure cache key."""
+    blob = json.dumps(data, sort_keys=True).encode()
+    return hashlib.blake2b(blob).hexdigest()
+
+# Figure caching. Every figure is built at most once per input and cached with
+# st.cache_data, keyed on the payload digest (or the gene symbol for the static
+# annotation figures); the `_data` / `_g_data` arguments are skipped by
+# Streamlit's hasher. Entries expire after an hour.
+#  - The main delta plot is Plotly: the browser renders it from a JSON spec, so
+#    a rerun only serializes the cached figure and zoom/pan cost the server
+#    nothing. Its download is a standalone interactive HTML file.
+#  - The other figures are matplotlib, rasterized once to PNG bytes by
+#    figure_png and shown with st.image: st.pyplot would re-run savefig on
+#    every rerun, and a shared Figure isn't safe to draw from concurrent sessions.
+figure_cache = st.cache_data(ttl=3600, show_spinner=False, max_entries=16)
+
+@figure_cache
+def plot_deltas_from_data(data_hash, _data, chrom, pos, ref, alt, line_color, highlight_color):
     """Plot using data returned from variant engine."""
-    curve = data["curve"]
-    metrics = data["metrics"]
-    tracks = data["tracks"]
+    curve = _data["curve"]
+    metrics = _data["metrics"]
+    tracks = _data["tracks"]
     
-    x = np.array(curve["x"])
-    y = np.array(curve["y"])
+    # Compact dtypes: Plotly ships numpy arrays as typed binary, so this halves the spec
+    x = np.asarray(curve["x"], dtype=np.int32)
+    y = np.asarray(curve["y"], dtype=np.float32)
     
-    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 8), sharex=True, gridspec_kw={'height_ratios': [3, 0.5, 0.5]})
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.04,
+                        row_heights=[0.75, 0.125, 0.125])
     
     # 1. Main Delta Plot
-    sns.lineplot(x=x, y=y, color=line_color, linewidth=2.5, ax=ax1, label='$\\Delta$ RNA-seq')
-    ax1.axhline(0, color='gray', linestyle='--', alpha=0.3)
-    ax1.axvline(0, color=highlight_color, linestyle=':', alpha=0.8)
+    fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name='Δ RNA-seq',
+                             line=dict(color=line_color, width=2.5)), row=1, col=1)
+    fig.add_hline(y=0, line=dict(color='gray', dash='dash'), opacity=0.3, row=1, col=1)
+    fig.add_vline(x=0, line=dict(color=highlight_color, dash='dot'), opacity=0.8)
     
     # Highlight Max
     max_pos = metrics["max_pos_rel"]
     max_val = metrics["max_delta"]
-    ax1.scatter(max_pos, max_val, color=highlight_color, s=150, zorder=5, edgecolor='white', linewidth=1.5)
-    ax1.annotate(f'Max: {max_val:.2f}', (max_pos, max_val), xytext=(10, 10), textcoords='offset points',
-                 bbox=dict(boxstyle="round,pad=0.3", fc="white", ec=highlight_color, alpha=0.9),
-                 arrowprops=dict(arrowstyle='->', connectionstyle="arc3,rad=.2", color=highlight_color))
-    
-    ax1.set_ylabel("$\\Delta$ RNA-seq")
-    ax1.set_title(f"Variant Impact: {chrom}:{pos} {ref}→{alt}", fontsize=14, fontweight='bold')
-    ax1.legend(loc='upper right', frameon=False)
-    sns.despine(ax=ax1, trim=True)
+    fig.add_trace(go.Scatter(x=[max_pos], y=[max_val], mode='markers', showlegend=False,
+                             marker=dict(color=highlight_color, size=14, line=dict(color='white', width=1.5)),
+                             hovertemplate='Max: %{y:.2f} at %{x} bp<extra></extra>'), row=1, col=1)
+    fig.add_annotation(x=max_pos, y=max_val, text=f'Max: {max_val:.2f}', ax=40, ay=-30,
+                       arrowcolor=highlight_color, bordercolor=highlight_color, bgcolor='white',
+                       row=1, col=1)
+    fig.update_yaxes(title_text="Δ RNA-seq", row=1, col=1)
     
     # 2. Gene Structure Track
-    ax2.plot([x[0], x[-1]], [0, 0], color='black', linewidth=1)
-    for exon in tracks["exons"]:
-        rect = plt.Rectangle((exon["start"], -0.4), exon["end"]-exon["start"], 0.8, facecolor='#3498db', alpha=0.7)
-        ax2.add_patch(rect)
-        ax2.text((exon["start"]+exon["end"])/2, 0, exon["label"], ha='center', va='center', color='white', fontsize=8)
-    ax2.set_yticks([])
-    ax2.set_ylabel("Gene")
-    sns.despine(ax=ax2, left=True, bottom=True)
+    fig.add_trace(go.Scatter(x=[x[0], x[-1]], y=[0, 0], mode='lines', showlegend=False,
+                             line=dict(color='black', width=1), hoverinfo='skip'), row=2, col=1)
+    exons = tracks["exons"]
+    # Clip exon bounds to the plotted window; drop exons that fall outside it
+    starts = np.clip([e["start"] for e in exons], x[0], x[-1])
+    ends = np.clip([e["end"] for e in exons], x[0], x[-1])
+    visible = np.flatnonzero(ends > starts)
+    # All exons as one horizontal bar trace
+    fig.add_trace(go.Bar(x=(ends - starts)[visible], base=starts[visible], y=np.zeros(visible.size),
+                         orientation='h', width=0.8, showlegend=False,
+                         marker=dict(color='#3498db', opacity=0.7),
+                         text=[exons[i]["label"] for i in visible], textposition='inside',
+                         insidetextanchor='middle', textfont=dict(color='white', size=10),
+                         customdata=ends[visible],
+                         hovertemplate='%{text}: %{base}–%{customdata} bp<extra></extra>'), row=2, col=1)
+    fig.update_yaxes(title_text="Gene", range=[-0.5, 0.5], showticklabels=False, row=2, col=1)
     
     # 3. Conservation Track
-    cons = np.array(tracks["conservation"])
-    ax3.fill_between(x, cons, 0, where=(cons>0), color='#27ae60', alpha=0.6)
-    ax3.fill_between(x, cons, 0, where=(cons<0), color='#95a5a6', alpha=0.3)
-    ax3.set_ylabel("PhyloP")
-    ax3.set_xlabel("Relative Genomic Coordinate (bp)")
-    sns.despine(ax=ax3, bottom=False)
+    cons = np.asarray(tracks["conservation"], dtype=np.float32)
+    fig.add_trace(go.Scatter(x=x, y=np.clip(cons, 0, None), fill='tozeroy', mode='none', showlegend=False,
+                             fillcolor='rgba(39,174,96,0.6)', hoverinfo='skip'), row=3, col=1)
+    fig.add_trace(go.Scatter(x=x, y=np.clip(cons, None, 0), fill='tozeroy', mode='none', showlegend=False,
+                             fillcolor='rgba(149,165,166,0.3)', hoverinfo='skip'), row=3, col=1)
+    fig.update_yaxes(title_text="PhyloP", row=3, col=1)
+    fig.update_xaxes(title_text="Relative Genomic Coordinate (bp)", range=[x[0], x[-1]], row=3, col=1)
     
-    plt.tight_layout()
+    fig.update_layout(
+        title=dict(text=f"<b>Variant Impact: {chrom}:{pos} {ref}→{alt}</b>", font=dict(size=18)),
+        height=640, template='simple_white', bargap=0,
+        legend=dict(x=1, y=1, xanchor='right'),
+        margin=dict(l=20, r=20, t=60, b=20),
+    )
     return fig
 
+def figure_png(fig, dpi=100):
+    """Rasterize and close a figure; st.image then serves the bytes as-is."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+@figure_cache
+def tissue_impact_png(data_hash, _data):
+    tissue_df = pd.DataFrame(_data["tissue_effects"])
+    is_cardio = tissue_df['tissue'].str.contains(CARDIO_TISSUES, regex=True, na=False).to_numpy()
+    
+    fig_tissue, ax_tissue = plt.subplots(figsize=(6, 4))
+    colors = np.where(is_cardio, '#E74C3C', '#95A5A6')
+    ax_tissue.barh(tissue_df['tissue'], tissue_df['delta'], color=colors)
+    ax_tissue.set_xlabel('|Δ RNA-seq|')
+    ax_tissue.set_title('Predicted Impact Across Tissues')
+    return figure_png(fig_tissue, dpi=200)
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=64)
+def background_histogram(data_hash, _data):
+    """Bin |background deltas| once per payload; returns (counts, edges)."""
+    bg_deltas = np.abs(np.asarray(_data["background_distribution"]["background_deltas"], dtype=np.float32))
+    return np.histogram(bg_deltas, bins=30)
+
+@figure_cache
+def background_distribution_png(data_hash, _data):
+    metrics = _data["metrics"]
+    bg_data = _data["background_distribution"]
+    counts, edges = background_histogram(data_hash, _data)
+    var_delta = bg_data["variant_delta"]
+    percentile = metrics['percentile']
+    
+    fig_dist, ax_dist = plt.subplots(figsize=(6, 4))
+    ax_dist.bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+                color='#95A5A6', alpha=0.6, edgecolor='black')
+    ax_dist.axvline(var_delta, color='#E74C3C', linewidth=3, linestyle='--', label=f'This variant (Top {100-percentile:.1f}%)')
+    ax_dist.set_xlabel('|Δ RNA-seq|')
+    ax_dist.set_ylabel('Frequency')
+    ax_dist.set_title(f'Distribution in {metrics["gene_symbol"]}')
+    ax_dist.legend()
+    return figure_png(fig_dist, dpi=200)
+
+# Gene annotations are static per symbol, so the symbol alone is the cache key
+@figure_cache
+def expression_png(gene_sym, _g_data):
+    expr_df = pd.DataFrame(_g_data['expression'])
+    is_cardio = expr_df['tissue'].str.contains(CARDIO_TISSUES, regex=True, na=False).to_numpy()
+    
+    fig_expr, ax_expr = plt.subplots(figsize=(10, 5))
+    colors = np.where(is_cardio, '#E74C3C', '#4C72B0')
+    ax_expr.bar(expr_df['tissue'], expr_df['tpm'], color=colors, edgecolor='black', alpha=0.8)
+    ax_expr.set_ylabel('TPM (Transcripts Per Million)')
+    ax_expr.set_title(f'{gene_sym} Expression (GTEx-style)')
+    ax_expr.tick_params(axis='x', rotation=45)
+    return figure_png(fig_expr)
+
+@figure_cache
+def protein_domains_png(gene_sym, _g_data):
+    domains = _g_data['protein_domains']
+    prot_len = _g_data['protein_length']
+    
+    fig_prot, ax_prot = plt.subplots(figsize=(10, 2))
+    ax_prot.plot([0, prot_len], [0, 0], color='black', linewidth=2)
+    
+    domain_colors = np.array(['#3498db', '#9b59b6', '#e67e22', '#1abc9c', '#34495e'])
+    starts = np.fromiter((d['start'] for d in domains), dtype=float, count=len(domains))
+    ends = np.fromiter((d['end'] for d in domains), dtype=float, count=len(domains))
+    widths = ends - starts
+    rects = [Rectangle((s, -0.3), w, 0.6) for s, w in zip(starts, widths)]
+    ax_prot.add_collection(PatchCollection(
+        rects, facecolors=domain_colors[np.arange(len(domains)) % len(domain_colors)],
+        edgecolor='black', alpha=0.7))
+    # Label only domains wide enough (>5% of the protein) to hold their name
+    mids = (starts + ends) / 2
+    for i in np.flatnonzero(widths > prot_len * 0.05):
+        ax_prot.text(mids[i], 0, domains[i]['name'], 
+                   ha='center', va='center', fontsize=8, color='white', fontweight='bold')
+    
+    var_aa_pos = int(prot_len * 0.4)
+    ax_prot.plot([var_aa_pos, var_aa_pos], [0.6, 1.2], color='#E74C3C', linewidth=2)
+    ax_prot.scatter([var_aa_pos], [1.2], color='#E74C3C', s=100, zorder=5, marker='v')
+    ax_prot.text(var_aa_pos, 1.4, 'Variant', ha='center', fontsize=9, color='#E74C3C', fontweight='bold')
+    
+    ax_prot.set_xlim(0, prot_len)
+    ax_prot.set_ylim(-0.5, 1.6)
+    ax_prot.set_yticks([])
+    ax_prot.set_xlabel('Amino Acid Position')
+    ax_prot.set_title(f'{gene_sym} Protein Domains (Length: {prot_len} aa)')
+    ax_prot.spines['left'].set_visible(False)
+    return figure_png(fig_prot)
+
+@st.fragment
+def delta_plot_panel(data_hash, data, chrom, position, ref, alt):
+    """Colour pickers, main delta plot and its download; recolouring reruns only this fragment."""
+    st.markdown("#### 🎨 Customization")
+    pc1, pc2 = st.columns(2)
+    with pc1:
+        line_color = st.color_picker("Signal Color", "#4C72B0")
+    with pc2:
+        highlight_color = st.color_picker("Highlight Color", "#DD8452")
+    
+    fig = plot_deltas_from_data(data_hash, data, chrom, position, ref, alt, line_color, highlight_color)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Export Plot (standalone interactive HTML; Plotly.js loaded from CDN)
+    fn = f"cardiovar_plot_{chrom}_{position}.html"
+    st.download_button("📸 Download Plot (HTML)", data=fig.to_html(include_plotlyjs='cdn'),
+                       file_name=fn, mime="text/html")
+
 # --- Main UI ---
 
 # Sidebar
@@ -126,11 +291,6 @@ with st.sidebar:
     with col2:
         alt = st.text_input("Alternate", "C")
         
-    st.markdown("---")
-    st.header("🎨 Customization")
-    line_color = st.color_picker("Signal Color", "#4C72B0")
-    highlight_color = st.color_picker("Highlight Color", "#DD8452")
-    
     run_btn = st.button("Run Analysis", type="primary")
 
 # Title
@@ -151,12 +311,29 @@ By leveraging deep learning models, it estimates how a specific variant alters R
 # Tabs
 tab1, tab2, tab3, tab4 = st.tabs(["📊 Variant Explorer", "🧬 Gene Annotations", "🗂️ Related Data", "🚀 Batch Analysis"])
 
-if run_btn:
+# The result is kept in session state under the input hash, so later reruns
+# redraw from it instead of dropping the plots.
+payload_hash = payload_digest({"chrom": chrom, "pos": position, "ref": ref,
+                               "alt": alt, "assembly": assembly_code})
+
+if run_btn and st.session_state.get("last_hash") != payload_hash:
     try:
         with st.spinner("Running Variant Analysis..."):
             # Call variant engine directly with assembly
             data = compute_variant_impact(chrom, position, ref, alt, assembly_code)
-            
+        st.session_state["data"] = data
+        st.session_state["data_hash"] = payload_digest(data)
+        st.session_state["last_hash"] = payload_hash
+    except ValueError as e:
+        # Handle assembly validation errors
+        st.warning(f"⚠️ {str(e)}")
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+
+if st.session_state.get("last_hash") == payload_hash:
+    try:
+        data = st.session_state["data"]
+        data_hash = st.session_state["data_hash"]
         metrics = data["metrics"]
         
         # Tab 1: Explorer
@@ -172,53 +349,23 @@ if run_btn:
                 st.metric("Gene", metrics['gene_symbol'])
             st.markdown("---")
             
-            # Plot
-            fig = plot_deltas_from_data(data, chrom, position, ref, alt, line_color, highlight_color)
-            st.pyplot(fig)
+            # Plot (colour pickers rerun only this panel)
+            delta_plot_panel(data_hash, data, chrom, position, ref, alt)
             
             # Additional Plots Row
             col_a, col_b = st.columns(2)
             
             with col_a:
                 st.subheader("Tissue-Specific Impact")
-                tissue_df = pd.DataFrame(data["tissue_effects"])
-                tissue_df['is_cardio'] = tissue_df['tissue'].apply(lambda x: 'Cardiovascular' if any(t in x for t in ['Heart', 'Aorta', 'Coronary']) else 'Other')
-                
-                fig_tissue, ax_tissue = plt.subplots(figsize=(6, 4))
-                colors = ['#E74C3C' if t == 'Cardiovascular' else '#95A5A6' for t in tissue_df['is_cardio']]
-                ax_tissue.barh(tissue_df['tissue'], tissue_df['delta'], color=colors)
-                ax_tissue.set_xlabel('|Δ RNA-seq|')
-                ax_tissue.set_title('Predicted Impact Across Tissues')
-                sns.despine()
-                plt.tight_layout()
-                st.pyplot(fig_tissue)
+                st.image(tissue_impact_png(data_hash, data))
                 st.caption("🔴 Cardiovascular tissues highlighted")
             
             with col_b:
                 st.subheader("Variant Percentile")
-                bg_data = data["background_distribution"]
-                bg_deltas = np.abs(bg_data["background_deltas"])
-                var_delta = bg_data["variant_delta"]
                 percentile = metrics['percentile']
-                
-                fig_dist, ax_dist = plt.subplots(figsize=(6, 4))
-                ax_dist.hist(bg_deltas, bins=30, color='#95A5A6', alpha=0.6, edgecolor='black')
-                ax_dist.axvline(var_delta, color='#E74C3C', linewidth=3, linestyle='--', label=f'This variant (Top {100-percentile:.1f}%)')
-                ax_dist.set_xlabel('|Δ RNA-seq|')
-                ax_dist.set_ylabel('Frequency')
-                ax_dist.set_title(f'Distribution in {metrics["gene_symbol"]}')
-                ax_dist.legend()
-                sns.despine()
-                plt.tight_layout()
-                st.pyplot(fig_dist)
+                st.image(background_distribution_png(data_hash, data))
                 st.caption(f"📊 This variant is in the **top {100-percentile:.1f}%** of predicted impact")
             
-            # Export Plot
-            fn = f"cardiovar_plot_{chrom}_{position}.png"
-            img = io.BytesIO()
-            fig.savefig(img, format='png')
-            st.download_button("📸 Download Plot", data=img, file_name=fn, mime="image/png")
-            
             # Export Data
             csv_data = pd.DataFrame({
                 "x": data["curve"]["x"],
@@ -237,51 +384,13 @@ if run_btn:
             # Expression Plot
             if 'expression' in g_data:
                 st.markdown("### Baseline Expression Across Tissues")
-                expr_df = pd.DataFrame(g_data['expression'])
-                expr_df['is_cardio'] = expr_df['tissue'].apply(lambda x: any(t in x for t in ['Heart', 'Aorta', 'Coronary']))
-                
-                fig_expr, ax_expr = plt.subplots(figsize=(10, 5))
-                colors = ['#E74C3C' if c else '#4C72B0' for c in expr_df['is_cardio']]
-                ax_expr.bar(expr_df['tissue'], expr_df['tpm'], color=colors, edgecolor='black', alpha=0.8)
-                ax_expr.set_ylabel('TPM (Transcripts Per Million)')
-                ax_expr.set_title(f'{gene_sym} Expression (GTEx-style)')
-                ax_expr.tick_params(axis='x', rotation=45)
-                sns.despine()
-                plt.tight_layout()
-                st.pyplot(fig_expr)
+                st.image(expression_png(gene_sym, g_data))
                 st.caption("🔴 Cardiovascular tissues | 🔵 Other tissues")
             
             # Protein Domains
             if 'protein_domains' in g_data and 'protein_length' in g_data:
                 st.markdown("### Protein Domain Architecture")
-                domains = g_data['protein_domains']
-                prot_len = g_data['protein_length']
-                
-                fig_prot, ax_prot = plt.subplots(figsize=(10, 2))
-                ax_prot.plot([0, prot_len], [0, 0], color='black', linewidth=2)
-                
-                domain_colors = ['#3498db', '#9b59b6', '#e67e22', '#1abc9c', '#34495e']
-                for i, domain in enumerate(domains):
-                    color = domain_colors[i % len(domain_colors)]
-                    rect = plt.Rectangle((domain['start'], -0.3), domain['end']-domain['start'], 0.6, 
-                                        facecolor=color, edgecolor='black', alpha=0.7)
-                    ax_prot.add_patch(rect)
-                    ax_prot.text((domain['start']+domain['end'])/2, 0, domain['name'], 
-                               ha='center', va='center', fontsize=8, color='white', fontweight='bold')
-                
-                var_aa_pos = int(prot_len * 0.4)
-                ax_prot.plot([var_aa_pos, var_aa_pos], [0.6, 1.2], color='#E74C3C', linewidth=2)
-                ax_prot.scatter([var_aa_pos], [1.2], color='#E74C3C', s=100, zorder=5, marker='v')
-                ax_prot.text(var_aa_pos, 1.4, 'Variant', ha='center', fontsize=9, color='#E74C3C', fontweight='bold')
-                
-                ax_prot.set_xlim(0, prot_len)
-                ax_prot.set_ylim(-0.5, 1.6)
-                ax_prot.set_yticks([])
-                ax_prot.set_xlabel('Amino Acid Position')
-                ax_prot.set_title(f'{gene_sym} Protein Domains (Length: {prot_len} aa)')
-                sns.despine(left=True)
-                plt.tight_layout()
-                st.pyplot(fig_prot)
+                st.image(protein_domains_png(gene_sym, g_data))
                 st.caption("🔻 Approximate variant position (mock)")
             
             st.markdown("### Pathways")
@@ -306,9 +415,6 @@ if run_btn:
             else:
                 st.info("No known ClinVar or GWAS associations found for this specific variant.")
                 
-    except ValueError as e:
-        # Handle assembly validation errors
-        st.warning(f"⚠️ {str(e)}")
     except Exception as e:
         st.error(f"An error occurred: {e}")
 
@@ -322,38 +428,45 @@ with tab4:
     if uploaded_file is not None:
         if st.button("Run Batch Prediction"):
             try:
-                df = pd.read_csv(uploaded_file)
+                df = read_batch_csv(uploaded_file)
                 
-                if not all(k in df.columns for k in ["chrom", "pos", "ref", "alt"]):
-                    st.error("CSV must contain chrom, pos, ref, alt columns.")
+                missing = set(BATCH_DTYPES) - set(df.columns)
+                if missing:
+                    st.error(f"CSV must contain chrom, pos, ref, alt columns (missing: {', '.join(sorted(missing))}).")
                 else:
-                    results = []
                     progress_bar = st.progress(0)
+                    variants = df.to_dict(orient="records")
+                    results = [None] * len(variants)
                     
-                    for idx, row in df.iterrows():
-                        res = compute_variant_impact(row['chrom'], row['pos'], row['ref'], row['alt'])
-                        metrics = res["metrics"]
-                        
-                        priority = "Low"
-                        if abs(metrics["max_delta"]) > 3.0:
-                            priority = "High"
-                        elif abs(metrics["max_delta"]) > 1.5:
-                            priority = "Medium"
+                    # The engine mostly waits on gnomAD/UCSC, so score variants
+                    # concurrently; rows keep upload order
+                    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as ex:
+                        futures = {
+                            ex.submit(compute_variant_impact, v['chrom'], v['pos'], v['ref'], v['alt']): i
+                            for i, v in enumerate(variants)
+                        }
+                        for done, fut in enumerate(as_completed(futures), 1):
+                            res = fut.result()
+                            metrics = res["metrics"]
+                            results[futures[fut]] = {
+                                "variant_id": res["variant_id"],
+                                "gene": metrics["gene_symbol"],
+                                "max_delta": metrics["max_delta"],
+                                "gnomad_freq": metrics["gnomad_freq"],
+                            }
                             
-                        results.append({
-                            "variant_id": res["variant_id"],
-                            "gene": metrics["gene_symbol"],
-                            "max_delta": metrics["max_delta"],
-                            "gnomad_freq": metrics["gnomad_freq"],
-                            "priority": priority
-                        })
-                        
-                        progress_bar.progress((idx + 1) / len(df))
+                            progress_bar.progress(done / len(variants))
                     
-                    res_df = pd.DataFrame(results)
+                    res_df = pd.DataFrame(results, columns=["variant_id", "gene", "max_delta", "gnomad_freq"])
+                    # Priority and its colour for the whole column in one pass each
+                    abs_delta = res_df["max_delta"].abs()
+                    res_df["priority"] = np.select([abs_delta > 3.0, abs_delta > 1.5], ["High", "Medium"], "Low")
+                    pri_styles = np.select([res_df["priority"] == "High", res_df["priority"] == "Medium"],
+                                           ["color: red", "color: orange"], "color: green")
                     st.success(f"Processed {len(results)} variants.")
                     
-                    st.dataframe(res_df, use_container_width=True)
+                    st.dataframe(res_df.style.apply(lambda _: pri_styles, subset=["priority"]),
+                                 use_container_width=True)
                     
                     csv = res_df.to_csv(index=False).encode('utf-8')
                     st.download_button("💾 Download Batch Results", data=csv, file_name="batch_results.csv", mime="text/csv")
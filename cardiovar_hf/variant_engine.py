@@ -56,7 +56,8 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
     
     # 2. Generate Curve Data with Realistic Model
     x = np.arange(-window_size, window_size + 1)
-    np.random.seed(pos % 10000)  # Deterministic seed based on pos
+    # Deterministic per-variant generator (local, so concurrent calls don't share RNG state)
+    rng = np.random.RandomState(pos % 10000)
     
     # Determine variant type based on position and alleles
     is_transition = (ref in ['A', 'G'] and alt in ['A', 'G']) or (ref in ['C', 'T'] and alt in ['C', 'T'])
@@ -66,17 +67,17 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
     # Base effect magnitude (depends on variant type)
     if is_splice_region:
         # Splice site variants: sharp, localized effect
-        base_magnitude = np.random.uniform(3.5, 5.5)
+        base_magnitude = rng.uniform(3.5, 5.5)
         spread = 15  # Narrow effect
         shape = 'sharp'
     elif is_regulatory:
         # Regulatory variants: broader, moderate effect
-        base_magnitude = np.random.uniform(2.0, 4.0)
+        base_magnitude = rng.uniform(2.0, 4.0)
         spread = 40  # Broad effect
         shape = 'broad'
     else:
         # Coding variants: moderate, intermediate spread
-        base_magnitude = np.random.uniform(1.5, 3.5)
+        base_magnitude = rng.uniform(1.5, 3.5)
         spread = 25
         shape = 'moderate'
     
@@ -104,11 +105,11 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
     
     # Add realistic noise (heteroscedastic - more noise at extremes)
     noise_level = 0.2 + 0.1 * np.abs(x) / window_size
-    noise = np.random.normal(0, noise_level, len(x))
+    noise = rng.normal(0, noise_level, len(x))
     
     # Add occasional outliers (biological variability)
-    outlier_mask = np.random.random(len(x)) < 0.05
-    noise[outlier_mask] += np.random.normal(0, 0.8, np.sum(outlier_mask))
+    outlier_mask = rng.random(len(x)) < 0.05
+    noise[outlier_mask] += rng.normal(0, 0.8, np.sum(outlier_mask))
     
     delta_rna = signal + noise
     
@@ -126,7 +127,7 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
     freq = fetch_gnomad_frequency(chrom, pos, ref, alt)
     if freq is None:
         # Fallback to mock if API fails
-        freq = np.random.uniform(0.00001, 0.0001)
+        freq = rng.uniform(0.00001, 0.0001)
         print(f"Using mock frequency for {chrom}:{pos} (gnomAD API unavailable)")
     else:
         print(f"Real gnomAD frequency for {chrom}:{pos}: {freq}")
@@ -148,7 +149,7 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
     else:
         # Fallback to synthetic
         print(f"⚠️ Using synthetic conservation for {chrom}:{pos} (UCSC API unavailable)")
-        cons_scores = np.random.normal(0.5, 1.0, len(x))
+        cons_scores = rng.normal(0.5, 1.0, len(x))
         cons_scores[window_size-10:window_size+10] += 2.0  # Conserved peak
     
     # Gene Structure (Exons) - Mock for now
@@ -160,14 +161,14 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
     for tissue in tissues:
         # Heart tissues have higher impact
         if "Heart" in tissue or "Aorta" in tissue or "Coronary" in tissue:
-            effect = abs(max_delta) * np.random.uniform(0.7, 1.2)
+            effect = abs(max_delta) * rng.uniform(0.7, 1.2)
         else:
-            effect = abs(max_delta) * np.random.uniform(0.1, 0.4)
+            effect = abs(max_delta) * rng.uniform(0.1, 0.4)
         tissue_effects.append({"tissue": tissue, "delta": round(effect, 2)})
     
     # 7. Background Distribution (mock - simulate other variants in this gene)
-    np.random.seed(pos % 100)
-    background_deltas = np.random.normal(0, 1.5, 200)  # 200 background variants
+    rng = np.random.RandomState(pos % 100)
+    background_deltas = rng.normal(0, 1.5, 200)  # 200 background variants
     background_deltas = background_deltas.tolist()
     
     # Calculate percentile
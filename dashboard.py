@@ -6,23 +6,14 @@ import warnings
 warnings.filterwarnings("ignore", message="numpy.dtype size changed")
 warnings.filterwarnings("ignore", message="numpy.ufunc size changed")
 
-import json, io, time, os, base64, collections, math
+import json, io, time, os, math, hashlib, string
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import streamlit as st
-import pandas as pd
-import numpy as np
-import requests
-import plotly.graph_objects as go
-
-from plots import (
-    plot_variant_impact_profile,
-    plot_background_kde,
-    plot_pathogenicity_radar,
-    plot_evidence_stack,
-    plot_gnomad_context,
-    plot_clinvar_lollipop,
-    plot_tissue_heatmap,
-    plot_enformer_tracks,
-)
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# pandas, plotly, requests and plots (SciPy) are imported inside the pages
+# that use them, so Gene Panel / Models / Settings paint without paying for them.
 
 # ── Page config ───────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -45,154 +36,188 @@ COLORS = {
     "success":    "#2A9D8F",
     "warning":    "#E9C46A",
     "danger":     "#C44027",
+    # Stylesheet-only shades (static/dashboard.css)
+    "primary_hover":  "#D94E28",
+    "warning_text":   "#9C7A00",
+    "border":         "#E8E8EC",
+    "border_light":   "#EAEAEA",
+    "sidebar_top":    "#1A1035",
+    "sidebar_bottom": "#0E1F3D",
+    "sidebar_text":   "#E8EAF0",
+    "shadow":         "#000000",
 }
 
 # ── Global CSS ────────────────────────────────────────────────────────────────
-st.markdown(f"""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-
-html, body, [class*="css"] {{
-    font-family: 'Inter', sans-serif;
-    background-color: {COLORS['background']};
-    color: {COLORS['text_dark']};
-}}
-
-/* ── Sidebar ─────────────────────────────────────────────────── */
-[data-testid="stSidebar"] {{
-    background: linear-gradient(175deg, #1a1035 0%, #0e1f3d 100%);
-    border-right: 1px solid rgba(255,255,255,0.07);
-}}
-[data-testid="stSidebar"] * {{
-    color: #e8eaf0 !important;
-}}
-[data-testid="stSidebar"] .stRadio label {{
-    padding: 6px 12px;
-    border-radius: 8px;
-    transition: background 0.15s;
-    font-size: 14px;
-    font-weight: 500;
-}}
-[data-testid="stSidebar"] .stRadio label:hover {{
-    background: rgba(244,96,54,0.18) !important;
-}}
-[data-testid="stSidebar"] hr {{
-    border-color: rgba(255,255,255,0.1) !important;
-}}
-
-/* ── Cards ───────────────────────────────────────────────────── */
-.cv-card {{
-    background: {COLORS['card_bg']};
-    border-radius: 14px;
-    padding: 24px 28px;
-    box-shadow: 0 2px 12px rgba(0,0,0,0.06);
-    margin-bottom: 20px;
-    border: 1px solid #E8E8EC;
-}}
-
-/* ── Metric tiles ─────────────────────────────────────────────── */
-.metric-tile {{
-    background: {COLORS['card_bg']};
-    border-radius: 12px;
-    padding: 16px 20px;
-    border: 1px solid #E8E8EC;
-    box-shadow: 0 2px 8px rgba(0,0,0,0.04);
-    text-align: center;
-}}
-.metric-label {{
-    font-size: 11px;
-    text-transform: uppercase;
-    letter-spacing: 1.2px;
-    color: {COLORS['text_light']};
-    margin-bottom: 6px;
-    font-weight: 600;
-}}
-.metric-value {{
-    font-size: 26px;
-    font-weight: 700;
-    color: {COLORS['text_dark']};
-    line-height: 1.1;
-}}
-.metric-sub {{
-    font-size: 11px;
-    color: {COLORS['text_light']};
-    margin-top: 4px;
-}}
-
-/* ── Classification badge ─────────────────────────────────────── */
-.badge {{
-    display: inline-block;
-    padding: 6px 18px;
-    border-radius: 20px;
-    font-weight: 700;
-    font-size: 14px;
-    letter-spacing: 0.5px;
-    text-transform: uppercase;
-}}
-.badge-pathogenic {{ background: rgba(196,64,39,0.12); color: {COLORS['danger']}; border: 1.5px solid {COLORS['danger']}; }}
-.badge-vus        {{ background: rgba(233,196,106,0.15); color: #9C7A00; border: 1.5px solid {COLORS['warning']}; }}
-.badge-benign     {{ background: rgba(42,157,143,0.12); color: {COLORS['success']}; border: 1.5px solid {COLORS['success']}; }}
-
-/* ── Section title ─────────────────────────────────────────────── */
-.section-title {{
-    font-size: 22px;
-    font-weight: 800;
-    color: {COLORS['text_dark']};
-    margin-bottom: 4px;
-}}
-.section-sub {{
-    font-size: 13px;
-    color: {COLORS['text_light']};
-    margin-bottom: 20px;
-}}
-
-/* ── Buttons ────────────────────────────────────────────────────── */
-.stButton>button {{
-    background: {COLORS['primary']};
-    color: white;
-    border-radius: 9px;
-    font-weight: 600;
-    font-size: 14px;
-    border: none;
-    padding: 0.5rem 1.2rem;
-    transition: all 0.2s ease;
-}}
-.stButton>button:hover {{
-    background: #D94E28;
-    box-shadow: 0 4px 12px rgba(244,96,54,0.3);
-    transform: translateY(-1px);
-}}
-
-/* ── Tabs ────────────────────────────────────────────────────────── */
-.stTabs [data-baseweb="tab-list"] {{ gap: 20px; }}
-.stTabs [data-baseweb="tab"] {{
-    height: 46px;
-    background: transparent;
-    border-radius: 6px 6px 0 0;
-    font-weight: 600;
-    font-size: 14px;
-    padding: 8px 4px;
-}}
-.stTabs [aria-selected="true"] {{
-    color: {COLORS['primary']} !important;
-    border-bottom: 2.5px solid {COLORS['primary']} !important;
-}}
-
-/* ── Gene card ────────────────────────────────────────────────────── */
-.gene-card {{
-    background: white;
-    border-radius: 14px;
-    padding: 20px;
-    border: 1.5px solid #EAEAEA;
-    box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-    transition: all 0.2s ease;
-}}
-.gene-card:hover {{
-    border-color: {COLORS['primary']};
-    box-shadow: 0 4px 16px rgba(244,96,54,0.12);
-}}
-</style>
-""", unsafe_allow_html=True)
+def palette_css() -> str:
+    """COLORS as CSS variables: --cv-<name> (hex) and --cv-<name>-rgb (for rgba())."""
+    decls = "".join(
+        f"--cv-{name.replace('_', '-')}: {hx}; "
+        f"--cv-{name.replace('_', '-')}-rgb: {int(hx[1:3], 16)},{int(hx[3:5], 16)},{int(hx[5:7], 16)}; "
+        for name, hx in COLORS.items())
+    return f":root {{ {decls}}}"
+
+@st.cache_resource
+def load_css() -> str:
+    """Palette variables plus the static stylesheet, built once per server process."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "dashboard.css"), encoding="utf-8") as f:
+        return f"<style>\n{palette_css()}\n{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+# ── Cached figures ────────────────────────────────────────────────────────────
+# Every widget interaction reruns the script; figures are rebuilt only when
+# the analysis payload changes.
+def _get_plotter(name: str):
+    """Resolve `name` to its plots.plot_* function (imports plots on first use)."""
+    import plots
+    if name == "tissue_heatmap":
+        return lambda d: plots.plot_tissue_heatmap(d.get("tissue_effects", []))
+    return getattr(plots, f"plot_{name}")
+
+def payload_digest(data: dict) -> str:
+    """Stable short hash of an analysis payload, used as the figure cache key."""
+    blob = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_plot(name: str, payload_hash: str, _data: dict, *args):
+    """Build plot `name` from `_data`; keyed on `payload_hash` (and `args`), not the dict itself."""
+    out = _get_plotter(name)(_data, *args)
+    # Same payload → same uirevision, so Plotly.js keeps zoom/axes and skips re-layout
+    fig = out[0] if isinstance(out, tuple) else out
+    fig.layout.uirevision = payload_hash
+    return out
+
+INFERENCE_PLOTS = [
+    "evidence_stack", "variant_impact_profile", "background_kde",
+    "pathogenicity_radar", "gnomad_context", "clinvar_lollipop",
+    "tissue_heatmap", "enformer_tracks",
+]
+
+@st.cache_resource
+def plot_executor():
+    """Thread pool for Inference figures, shared by every session (one per server process)."""
+    return ThreadPoolExecutor(max_workers=len(INFERENCE_PLOTS), thread_name_prefix="plots")
+
+def _with_run_ctx(ctx, fn, *args):
+    """Run fn on a pool thread attached to the submitting session's script context."""
+    add_script_run_ctx(None, ctx)
+    return fn(*args)
+
+def submit_inference_plots(data: dict, data_hash: str, chrom: str, pos: int) -> dict:
+    """Build all Inference figures concurrently; returns {name: Future}."""
+    # Figures still queued from this session's previous run are stale
+    for fut in st.session_state.get("plot_futures", {}).values():
+        fut.cancel()
+    ctx = get_script_run_ctx()
+    ex = plot_executor()
+    futures = {}
+    for name in INFERENCE_PLOTS:
+        args = (chrom, pos) if name == "clinvar_lollipop" else ()
+        futures[name] = ex.submit(_with_run_ctx, ctx, cached_plot, name, data_hash, data, *args)
+    st.session_state.plot_futures = futures
+    return futures
+
+@st.cache_resource
+def api_session():
+    """Keep-alive HTTP session shared by every backend call (one per server process)."""
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=1)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fanout_variant_impact(variants: list, on_progress=None, max_workers: int = 16) -> list:
+    """
+    Score variants with concurrent /variant-impact calls over the pooled session.
+    Used when /batch-start is unavailable; rows match the batch job's results.
+    """
+    from concurrent.futures import as_completed
+
+    session = api_session()
+
+    def score(v):
+        vid = f"{v['chrom']}:{v['pos']}:{v['ref']}:{v['alt']}"
+        try:
+            r = session.post(f"{API_URL}/variant-impact", json=v, timeout=300)
+            r.raise_for_status()
+            res = orjson.loads(r.content)
+            m = res["metrics"]
+            max_abs = abs(m["max_delta"])
+            return {
+                "variant_id": res["variant_id"],
+                "gene": m["gene_symbol"],
+                "max_delta": m["max_delta"],
+                "gnomad_freq": m["gnomad_freq"],
+                "priority": "High" if max_abs > 3.0 else "Medium" if max_abs > 1.5 else "Low",
+                "status": "success",
+            }
+        except Exception as e:
+            return {"variant_id": vid, "status": "failed", "error": str(e)}
+
+    results = [None] * len(variants)
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = {ex.submit(score, v): i for i, v in enumerate(variants)}
+        for done, fut in enumerate(as_completed(futures), 1):
+            results[futures[fut]] = fut.result()
+            if on_progress:
+                on_progress(done, len(variants))
+    return results
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_related_data(chrom: str, pos: int, ref: str, alt: str):
+    """GET /related-data for a variant, cached for an hour (errors raise and are not cached)."""
+    r = api_session().get(f"{API_URL}/related-data",
+                          params={"chrom": chrom, "pos": pos, "ref": ref, "alt": alt}, timeout=15)
+    r.raise_for_status()
+    return r.json()
+
+@st.cache_data(ttl=2, show_spinner=False)
+def fetch_system_status():
+    """GET /system-status as (status_code, body); a 2 s TTL coalesces repeated clicks."""
+    r = api_session().get(f"{API_URL}/system-status", timeout=5)
+    return r.status_code, (r.json() if r.status_code == 200 else None)
+
+# ACMG-style label → badge CSS class
+BADGE_CLASSES = {
+    "LIKELY PATHOGENIC": "badge-pathogenic",
+    "VUS": "badge-vus",
+    "LIKELY BENIGN": "badge-benign",
+}
+
+# Static markup for the results header; only the fields are filled per rerun
+RESULTS_HEADER_FMT = (
+    f"<div style='font-size:18px;font-weight:700;color:{COLORS['text_dark']};margin-bottom:4px;'>Results — {{var_id}}</div>"
+    f"<div style='font-size:12px;color:{COLORS['text_light']};'>Model: {{model}} · {{ts}}</div>"
+)
+BADGE_FMT = "<div style='text-align:right;margin-top:8px;'><span class='badge {cls}'>{label}</span></div>"
+
+# Each st.markdown is its own element (and delta message), so a lone "</div>"
+# never closes anything: a card's opener goes out together with its heading.
+CARD_OPEN = "<div class='cv-card'>"
+
+def page_header(title: str, sub: str = None):
+    """Page title and optional subtitle in a single markdown element."""
+    html = f"<div class='section-title'>{title}</div>"
+    if sub:
+        html += f"<div class='section-sub'>{sub}</div>"
+    st.markdown(html, unsafe_allow_html=True)
+
+def card_markdown(body: str):
+    """Open a cv-card with `body` (markdown) inside it, in one element."""
+    st.markdown(f"{CARD_OPEN}\n\n{body}\n\n</div>", unsafe_allow_html=True)
+
+# Plotly modebar: no logo link, otherwise defaults
+PLOTLY_CONFIG = {"displaylogo": False}
+
+PRIORITY_STYLES = {
+    "High":   f"color: {COLORS['danger']}; font-weight: 600",
+    "Medium": f"color: {COLORS['primary']}",
+    "Low":    f"color: {COLORS['success']}",
+}
+
+RELATED_COLUMNS = ["chrom", "pos", "rsid", "clinical_significance", "trait", "source"]
 
 # ── Session state defaults ──────────────────────────────────────────────────
 if "analysis_results" not in st.session_state:
@@ -244,14 +269,15 @@ with st.sidebar:
             "analysis_results": st.session_state.get("analysis_results", {}),
             "page": st.session_state.get("page", "Inference"),
         }
-        st.download_button("⬇ Download JSON", json.dumps(state_dump, indent=2),
+        st.download_button("⬇ Download JSON",
+                           orjson.dumps(state_dump, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY),
                            "cardiovar_workspace.json", "application/json",
                            use_container_width=True)
 
     ws_file = st.file_uploader("📂 Load Workspace", type=["json"], label_visibility="collapsed")
     if ws_file:
         try:
-            loaded = json.load(ws_file)
+            loaded = orjson.loads(ws_file.getvalue())
             st.session_state.inputs.update(loaded.get("inputs", {}))
             st.session_state.analysis_results = loaded.get("analysis_results", {})
             st.session_state.page = loaded.get("page", "Inference")
@@ -265,24 +291,129 @@ with st.sidebar:
     st.markdown(f"<div style='font-size:11px;color:#555;'>v1.2.0 · GRCh38 · Enformer</div>",
                 unsafe_allow_html=True)
 
+# ── Page data & cached renderers ──────────────────────────────────────────────
+CHROMS = tuple(f"chr{i}" for i in range(1, 23)) + ("chrX", "chrY")
+
+GENE_PANEL = [
+    {"symbol": "MYH9",  "name": "Myosin Heavy Chain 9",      "disease": "HCM / MYH9-RD",
+     "variant": {"chrom": "chr22", "pos": 36191400,   "ref": "A", "alt": "C"}},
+    {"symbol": "LMNA",  "name": "Lamin A/C",                  "disease": "DCM / EDMD",
+     "variant": {"chrom": "chr1",  "pos": 156104762,  "ref": "G", "alt": "A"}},
+    {"symbol": "PCSK9", "name": "Proprotein Convertase 9",    "disease": "Familial HCholesterol",
+     "variant": {"chrom": "chr1",  "pos": 55039974,   "ref": "G", "alt": "A"}},
+    {"symbol": "ACTN2", "name": "Actinin Alpha 2",            "disease": "HCM / DCM",
+     "variant": {"chrom": "chr1",  "pos": 236893000,  "ref": "C", "alt": "T"}},
+    {"symbol": "TTN",   "name": "Titin",                      "disease": "DCM / HCM",
+     "variant": {"chrom": "chr2",  "pos": 178525989,  "ref": "G", "alt": "A"}},
+    {"symbol": "APOB",  "name": "Apolipoprotein B",           "disease": "Familial HCholesterol",
+     "variant": {"chrom": "chr2",  "pos": 21009300,   "ref": "C", "alt": "T"}},
+    {"symbol": "MYL3",  "name": "Myosin Light Chain 3",       "disease": "HCM",
+     "variant": {"chrom": "chr3",  "pos": 46900000,   "ref": "A", "alt": "G"}},
+]
+
+@st.cache_resource
+def gene_cards_html() -> tuple:
+    """Static HTML for each GENE_PANEL card, rendered once per server process."""
+    cards = []
+    for gene in GENE_PANEL:
+        v = gene["variant"]
+        cards.append(f"""
+            <div class='gene-card'>
+                <div style='font-size:20px;font-weight:800;color:{COLORS["primary"]};'>{gene['symbol']}</div>
+                <div style='font-size:13px;color:{COLORS["text_dark"]};font-weight:500;margin:4px 0;'>{gene['name']}</div>
+                <div style='font-size:11px;color:{COLORS["text_light"]};margin-bottom:10px;'>🫀 {gene['disease']}</div>
+                <div style='font-size:11px;font-family:monospace;background:#F4F5F7;padding:6px 10px;border-radius:6px;'>
+                    {v['chrom']}:{v['pos']:,} {v['ref']}→{v['alt']}
+                </div>
+            </div>
+            """)
+    return tuple(cards)
+
+
+@st.cache_data(show_spinner=False)
+def msa_figure_png(content: str, kind: str) -> bytes:
+    """
+    Render an msaexplorer figure for an alignment once; reruns reuse the PNG.
+    kind: "similarity" (similarity matrix) or "identity" (per-position identity).
+    """
+    from msaexplorer.explore import MSA
+    import msaexplorer.draw as msa_draw
+    import matplotlib.pyplot as plt
+
+    msa = MSA(content)
+    if kind == "similarity":
+        fig, ax = plt.subplots(figsize=(12, 5))
+        msa_draw.similarity_alignment(msa, ax=ax)
+        ax.set_title("Sequence Similarity Matrix", fontsize=13, fontweight="bold")
+    else:
+        fig, ax = plt.subplots(figsize=(12, 4))
+        msa_draw.stat_plot(msa, stat_type="identity", ax=ax)
+        ax.set_title("Per-Position Identity", fontsize=13, fontweight="bold")
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=110, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+# Past this many columns per-position bars collapse below a pixel; plot windows
+ENTROPY_MAX_COLUMNS = 5000
+ENTROPY_BARS = 2000
+MAX_ENTROPY_DNA = math.log2(4)  # bits, 4 equiprobable bases
+
+# HTML report body ($fields filled on the Report page). The script re-executes on
+# every rerun, so the template is read and parsed once per process instead.
+@st.cache_resource
+def report_template() -> string.Template:
+    """Parse static/report.html once per server process."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "report.html"), encoding="utf-8") as f:
+        return string.Template(f.read())
+
+
+@st.cache_data(show_spinner=False)
+def shannon_entropy(seqs: tuple, length: int):
+    """
+    Per-column Shannon entropy (bits) of an alignment given as a tuple of bytes.
+
+    Sequences shorter than `length` simply don't contribute to the trailing
+    columns. All symbols (including gaps) count as states.
+    """
+    import numpy as np
+    from scipy.special import xlogy
+
+    # N × L byte matrix; NUL marks positions past the end of a sequence
+    M = np.frombuffer(
+        b"".join(s[:length].ljust(length, b"\0") for s in seqs),
+        dtype=np.uint8,
+    ).reshape(len(seqs), length)
+    symbols = np.unique(M)
+    counts = np.stack([(M == c).sum(axis=0) for c in symbols[symbols != 0]]) if symbols.any() \
+        else np.zeros((1, length))
+    total = counts.sum(axis=0, keepdims=True)
+    p = np.divide(counts, total, out=np.zeros(counts.shape), where=total > 0)
+    return -xlogy(p, p).sum(axis=0) / np.log(2)
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # Page: Inference
 # ══════════════════════════════════════════════════════════════════════════════
-if selected_page == "Inference":
-    st.markdown("<div class='section-title'>Variant Inference</div>", unsafe_allow_html=True)
-    st.markdown("<div class='section-sub'>Enter a genomic variant (GRCh38) to predict regulatory impact via Enformer.</div>", unsafe_allow_html=True)
+@st.fragment
+def inference_page():
+    """Input card + results. Runs as a fragment so widget edits and Run only rerun this page."""
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    page_header("Variant Inference", "Enter a genomic variant (GRCh38) to predict regulatory impact via Enformer.")
 
     # Input card
     with st.container():
-        st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
+        st.markdown(CARD_OPEN, unsafe_allow_html=True)
         demo_col, _ = st.columns([1, 4])
         with demo_col:
             if st.button("⚡ Load Demo (MYH9)"):
                 st.session_state.inputs.update({"chrom": "chr22", "pos": 36191400, "ref": "A", "alt": "C"})
-                st.rerun()
+                st.rerun(scope="fragment")
 
         c1, c2, c3, c4, c5 = st.columns([2, 2, 1, 1, 2])
-        CHROMS = [f"chr{i}" for i in range(1, 23)] + ["chrX", "chrY"]
         with c1:
             chrom = st.selectbox("Chromosome", CHROMS,
                                  index=CHROMS.index(st.session_state.inputs.get("chrom", "chr22")))
@@ -296,7 +427,6 @@ if selected_page == "Inference":
         with c5:
             st.markdown("<div style='height:28px'></div>", unsafe_allow_html=True)
             run_btn = st.button("▶ Run Analysis", use_container_width=True)
-        st.markdown("</div>", unsafe_allow_html=True)
 
     st.session_state.inputs.update({"chrom": chrom, "pos": pos, "ref": ref, "alt": alt})
 
@@ -310,9 +440,9 @@ if selected_page == "Inference":
                        "ref": ref, "alt": alt, "force_live": False}
             try:
                 with st.spinner("Running Enformer inference — this may take 30–60 s on first run…"):
-                    resp = requests.post(f"{API_URL}/variant-impact", json=payload, timeout=300)
+                    resp = api_session().post(f"{API_URL}/variant-impact", json=payload, timeout=300)
                     resp.raise_for_status()
-                    st.session_state.analysis_results = resp.json()
+                    st.session_state.analysis_results = orjson.loads(resp.content)
             except Exception as e:
                 st.error(f"Analysis failed: {e}")
 
@@ -321,49 +451,50 @@ if selected_page == "Inference":
         data    = st.session_state.analysis_results
         metrics = data.get("metrics", {})
         var_id  = f"{chrom}:{pos} {ref}→{alt}"
+        data_hash = payload_digest(data)
+        figs = submit_inference_plots(data, data_hash, chrom, pos)
 
         # ── Evidence stack → classification badge ─────────────────────────
         try:
-            _, label, badge_color = plot_evidence_stack(data)
+            _, label, _ = figs["evidence_stack"].result()
         except Exception:
-            label, badge_color = "VUS", COLORS["warning"]
+            label = "VUS"
 
-        badge_cls = {
-            "LIKELY PATHOGENIC": "badge-pathogenic",
-            "VUS": "badge-vus",
-            "LIKELY BENIGN": "badge-benign",
-        }.get(label, "badge-vus")
+        badge_cls = BADGE_CLASSES.get(label, "badge-vus")
 
         # Header row: variant ID + badge
         hc1, hc2 = st.columns([3, 1])
         with hc1:
-            st.markdown(f"<div style='font-size:18px;font-weight:700;color:{COLORS['text_dark']};margin-bottom:4px;'>Results — {var_id}</div>", unsafe_allow_html=True)
-            model_used = metrics.get("model_used", "Unknown")
-            st.markdown(f"<div style='font-size:12px;color:{COLORS['text_light']};'>Model: {model_used} · {time.strftime('%Y-%m-%d %H:%M')}</div>", unsafe_allow_html=True)
+            st.markdown(RESULTS_HEADER_FMT.format(
+                var_id=var_id,
+                model=metrics.get("model_used", "Unknown"),
+                ts=time.strftime("%Y-%m-%d %H:%M"),
+            ), unsafe_allow_html=True)
         with hc2:
-            st.markdown(f"<div style='text-align:right;margin-top:8px;'><span class='badge {badge_cls}'>{label}</span></div>", unsafe_allow_html=True)
+            st.markdown(BADGE_FMT.format(cls=badge_cls, label=label), unsafe_allow_html=True)
 
         # Metrics tiles
         conf = metrics.get("confidence", 0.0)
-        conf_color = COLORS["success"] if conf > 80 else COLORS["warning"] if conf > 50 else COLORS["danger"]
-        zscore_color = COLORS["danger"] if abs(metrics.get("z_score", 0)) > 2 else COLORS["text_dark"]
-
-        m1, m2, m3, m4, m5, m6 = st.columns(6)
-        for col, lbl, val, sub in [
-            (m1, "Gene",        metrics.get("gene_symbol", "N/A"), "Symbol"),
-            (m2, "Max |Δ|",     f"{abs(metrics.get('max_delta', 0)):.4f}", "Enformer"),
-            (m3, "Z-Score",     f"{metrics.get('z_score', 0):.2f}", "vs background"),
-            (m4, "Percentile",  f"{metrics.get('percentile', 0):.1f}%", "in gene"),
-            (m5, "gnomAD Freq", f"{metrics.get('gnomad_freq', 0):.2e}", "population"),
-            (m6, "Confidence",  f"{conf:.0f}%", "data quality"),
-        ]:
-            with col:
-                st.markdown(f"""
-                <div class='metric-tile'>
-                    <div class='metric-label'>{lbl}</div>
-                    <div class='metric-value'>{val}</div>
-                    <div class='metric-sub'>{sub}</div>
-                </div>""", unsafe_allow_html=True)
+
+        tiles = [
+            ("Gene",        metrics.get("gene_symbol", "N/A"), "Symbol"),
+            ("Max |Δ|",     f"{abs(metrics.get('max_delta', 0)):.4f}", "Enformer"),
+            ("Z-Score",     f"{metrics.get('z_score', 0):.2f}", "vs background"),
+            ("Percentile",  f"{metrics.get('percentile', 0):.1f}%", "in gene"),
+            ("gnomAD Freq", f"{metrics.get('gnomad_freq', 0):.2e}", "population"),
+            ("Confidence",  f"{conf:.0f}%", "data quality"),
+        ]
+        # One markdown element for all six tiles instead of six columns
+        st.markdown(
+            "<div style='display:grid;grid-template-columns:repeat(6,1fr);gap:12px;'>"
+            + "".join(
+                f"<div class='metric-tile'><div class='metric-label'>{lbl}</div>"
+                f"<div class='metric-value'>{val}</div><div class='metric-sub'>{sub}</div></div>"
+                for lbl, val, sub in tiles
+            )
+            + "</div>",
+            unsafe_allow_html=True,
+        )
 
         st.markdown("<br>", unsafe_allow_html=True)
 
@@ -379,94 +510,77 @@ if selected_page == "Inference":
 
         # ── Tab: Impact Profile ────────────────────────────────────────────
         with t_impact:
-            st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-            st.markdown("**Plot A — Multi-Track Genomic Browser** | Enformer ΔRNA-seq signal with gene structure and PhyloP conservation")
+            st.markdown(CARD_OPEN + "\n\n**Plot A — Multi-Track Genomic Browser** | Enformer ΔRNA-seq signal with gene structure and PhyloP conservation", unsafe_allow_html=True)
             try:
-                fig_a = plot_variant_impact_profile(data)
-                st.plotly_chart(fig_a, use_container_width=True)
+                fig_a = figs["variant_impact_profile"].result()
+                st.plotly_chart(fig_a, use_container_width=True, config=PLOTLY_CONFIG, key="plot_A")
             except Exception as e:
                 st.error(f"Plot A failed: {e}")
-            st.markdown("</div>", unsafe_allow_html=True)
 
         # ── Tab: Statistical Context ───────────────────────────────────────
         with t_stats:
             col_b, col_c = st.columns(2)
             with col_b:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                st.markdown("**Plot B — Background Distribution** | Gene-specific KDE with variant Z-score")
+                st.markdown(CARD_OPEN + "\n\n**Plot B — Background Distribution** | Gene-specific KDE with variant Z-score", unsafe_allow_html=True)
                 try:
-                    fig_b = plot_background_kde(data)
-                    st.plotly_chart(fig_b, use_container_width=True)
+                    fig_b = figs["background_kde"].result()
+                    st.plotly_chart(fig_b, use_container_width=True, config=PLOTLY_CONFIG, key="plot_B")
                 except Exception as e:
                     st.error(f"Plot B failed: {e}")
-                st.markdown("</div>", unsafe_allow_html=True)
             with col_c:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                st.markdown("**Plot C — Pathogenicity Radar** | Multi-evidence profile vs known pathogenic median")
+                st.markdown(CARD_OPEN + "\n\n**Plot C — Pathogenicity Radar** | Multi-evidence profile vs known pathogenic median", unsafe_allow_html=True)
                 try:
-                    fig_c = plot_pathogenicity_radar(data)
-                    st.plotly_chart(fig_c, use_container_width=True)
+                    fig_c = figs["pathogenicity_radar"].result()
+                    st.plotly_chart(fig_c, use_container_width=True, config=PLOTLY_CONFIG, key="plot_C")
                 except Exception as e:
                     st.error(f"Plot C failed: {e}")
-                st.markdown("</div>", unsafe_allow_html=True)
 
-            st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-            st.markdown("**Plot D — Evidence Breakdown**")
+            st.markdown(CARD_OPEN + "\n\n**Plot D — Evidence Breakdown**", unsafe_allow_html=True)
             try:
-                fig_d, _, _ = plot_evidence_stack(data)
-                st.plotly_chart(fig_d, use_container_width=True)
+                fig_d, _, _ = figs["evidence_stack"].result()
+                st.plotly_chart(fig_d, use_container_width=True, config=PLOTLY_CONFIG, key="plot_D")
             except Exception as e:
                 st.error(f"Plot D failed: {e}")
-            st.markdown("</div>", unsafe_allow_html=True)
 
         # ── Tab: Population & Clinical ─────────────────────────────────────
         with t_popn:
             col_e, col_f = st.columns(2)
             with col_e:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                st.markdown("**Plot E — gnomAD Allele Frequency Context** | Population distribution")
+                st.markdown(CARD_OPEN + "\n\n**Plot E — gnomAD Allele Frequency Context** | Population distribution", unsafe_allow_html=True)
                 try:
-                    fig_e = plot_gnomad_context(data)
-                    st.plotly_chart(fig_e, use_container_width=True)
+                    fig_e = figs["gnomad_context"].result()
+                    st.plotly_chart(fig_e, use_container_width=True, config=PLOTLY_CONFIG, key="plot_E")
                 except Exception as e:
                     st.error(f"Plot E failed: {e}")
-                st.markdown("</div>", unsafe_allow_html=True)
             with col_f:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                st.markdown("**Plot F — ClinVar Region Map** | Known variants ±50 kb (lollipop)")
+                st.markdown(CARD_OPEN + "\n\n**Plot F — ClinVar Region Map** | Known variants ±50 kb (lollipop)", unsafe_allow_html=True)
                 try:
-                    fig_f = plot_clinvar_lollipop(data, chrom, pos)
-                    st.plotly_chart(fig_f, use_container_width=True)
+                    fig_f = figs["clinvar_lollipop"].result()
+                    st.plotly_chart(fig_f, use_container_width=True, config=PLOTLY_CONFIG, key="plot_F")
                 except Exception as e:
                     st.error(f"Plot F failed: {e}")
-                st.markdown("</div>", unsafe_allow_html=True)
 
         # ── Tab: Tissue Effects ────────────────────────────────────────────
         with t_tissue:
             col_g, col_h = st.columns([1, 1])
             with col_g:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                st.markdown("**Plot G — Tissue-Specific Impact** | Sorted by predicted effect magnitude")
+                st.markdown(CARD_OPEN + "\n\n**Plot G — Tissue-Specific Impact** | Sorted by predicted effect magnitude", unsafe_allow_html=True)
                 try:
-                    te = data.get("tissue_effects", [])
-                    fig_g = plot_tissue_heatmap(te)
-                    st.plotly_chart(fig_g, use_container_width=True)
+                    fig_g = figs["tissue_heatmap"].result()
+                    st.plotly_chart(fig_g, use_container_width=True, config=PLOTLY_CONFIG, key="plot_G")
                 except Exception as e:
                     st.error(f"Plot G failed: {e}")
-                st.markdown("</div>", unsafe_allow_html=True)
             with col_h:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                st.markdown("**Plot H — Enformer Track Heatmap** | Top 20 differentially predicted chromatin/CAGE tracks")
+                st.markdown(CARD_OPEN + "\n\n**Plot H — Enformer Track Heatmap** | Top 20 differentially predicted chromatin/CAGE tracks", unsafe_allow_html=True)
                 try:
-                    fig_h = plot_enformer_tracks(data)
-                    st.plotly_chart(fig_h, use_container_width=True)
+                    fig_h = figs["enformer_tracks"].result()
+                    st.plotly_chart(fig_h, use_container_width=True, config=PLOTLY_CONFIG, key="plot_H")
                 except Exception as e:
                     st.error(f"Plot H failed: {e}")
-                st.markdown("</div>", unsafe_allow_html=True)
 
         # ── Tab: Gene Context ──────────────────────────────────────────────
         with t_gene:
-            st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
+            st.markdown(CARD_OPEN, unsafe_allow_html=True)
             g_data = data.get("gene", {})
             if g_data:
                 gc1, gc2 = st.columns([2, 1])
@@ -506,68 +620,76 @@ if selected_page == "Inference":
                             margin=dict(l=0, r=0, t=10, b=0),
                             plot_bgcolor="rgba(0,0,0,0)",
                             paper_bgcolor="rgba(0,0,0,0)",
+                            template=None,
+                            uirevision="cardiovar-v1",
                         )
-                        st.plotly_chart(fig_expr, use_container_width=True)
+                        st.plotly_chart(fig_expr, use_container_width=True,
+                                        theme=None, config=PLOTLY_CONFIG, key="plot_gtex_expr")
             else:
                 st.info("Gene context unavailable (Ensembl API may be offline).")
-            st.markdown("</div>", unsafe_allow_html=True)
 
         # ── Tab: Related Data ──────────────────────────────────────────────
         with t_related:
-            st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-            st.markdown("### Known ClinVar / GWAS Associations")
-            try:
-                payload_rd = {"chrom": chrom, "pos": pos, "ref": ref, "alt": alt}
-                r_resp = requests.post(f"{API_URL}/related-data", json=payload_rd, timeout=15)
-                if r_resp.status_code == 200:
-                    r_data = r_resp.json()
+            st.markdown(CARD_OPEN + "\n\n### Known ClinVar / GWAS Associations", unsafe_allow_html=True)
+            # /related-data is only fetched on request (then remembered for this
+            # variant), so a run doesn't pay for a tab the user may never open
+            var_key = f"{chrom}:{pos}:{ref}:{alt}"
+            if st.session_state.get("related_for") != var_key:
+                if st.button("Load related data", key="load_related"):
+                    st.session_state.related_for = var_key
+                else:
+                    st.caption("ClinVar, dbSNP and local associations are fetched on demand.")
+            if st.session_state.get("related_for") == var_key:
+                try:
+                    r_data = fetch_related_data(chrom, pos, ref, alt)
                     if r_data:
-                        st.dataframe(pd.DataFrame(r_data), use_container_width=True)
-                    else:
-                        st.info("No known associations found in ClinVar or GWAS Catalog for this position.")
-            except Exception:
-                st.warning("Related data API unavailable (API server may be offline).")
-            st.markdown("</div>", unsafe_allow_html=True)
+                        # Flatten ClinVar / dbSNP / local hits into fixed-schema rows
+                        rows = []
+                        cv = r_data.get("clinvar")
+                        if cv:
+                            rows.append({"chrom": chrom, "pos": pos, "rsid": None,
+                                         "clinical_significance": cv.get("clinical_significance") or cv.get("germline_classification"),
+                                         "trait": cv.get("title"), "source": "ClinVar"})
+                        db = r_data.get("dbsnp")
+                        if db:
+                            rows.append({"chrom": chrom, "pos": pos, "rsid": db.get("rsid"),
+                                         "clinical_significance": db.get("clinical_significance"),
+                                         "trait": db.get("gene"), "source": "dbSNP"})
+                        for item in r_data.get("local_fallback") or []:
+                            rows.append({**item, "source": item.get("source", "Local")})
+                        if rows:
+                            # Plain (unstyled) frame with explicit dtypes
+                            rel_df = pd.DataFrame.from_records(rows, columns=RELATED_COLUMNS).astype(
+                                {"pos": "int32", "chrom": "category", "rsid": "string"})
+                            st.dataframe(rel_df, hide_index=True, use_container_width=True,
+                                         column_config={
+                                             "chrom": "Chrom",
+                                             "pos": st.column_config.NumberColumn("Position", format="%d"),
+                                             "rsid": "rsID",
+                                             "clinical_significance": "Clinical significance",
+                                             "trait": "Trait / title",
+                                             "source": "Source",
+                                         })
+                        else:
+                            st.info("No known associations found in ClinVar or GWAS Catalog for this position.")
+                except Exception:
+                    st.warning("Related data API unavailable (API server may be offline).")
+
+
+if selected_page == "Inference":
+    inference_page()
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # Page: Gene Panel
 # ══════════════════════════════════════════════════════════════════════════════
-GENE_PANEL = [
-    {"symbol": "MYH9",  "name": "Myosin Heavy Chain 9",      "disease": "HCM / MYH9-RD",
-     "variant": {"chrom": "chr22", "pos": 36191400,   "ref": "A", "alt": "C"}},
-    {"symbol": "LMNA",  "name": "Lamin A/C",                  "disease": "DCM / EDMD",
-     "variant": {"chrom": "chr1",  "pos": 156104762,  "ref": "G", "alt": "A"}},
-    {"symbol": "PCSK9", "name": "Proprotein Convertase 9",    "disease": "Familial HCholesterol",
-     "variant": {"chrom": "chr1",  "pos": 55039974,   "ref": "G", "alt": "A"}},
-    {"symbol": "ACTN2", "name": "Actinin Alpha 2",            "disease": "HCM / DCM",
-     "variant": {"chrom": "chr1",  "pos": 236893000,  "ref": "C", "alt": "T"}},
-    {"symbol": "TTN",   "name": "Titin",                      "disease": "DCM / HCM",
-     "variant": {"chrom": "chr2",  "pos": 178525989,  "ref": "G", "alt": "A"}},
-    {"symbol": "APOB",  "name": "Apolipoprotein B",           "disease": "Familial HCholesterol",
-     "variant": {"chrom": "chr2",  "pos": 21009300,   "ref": "C", "alt": "T"}},
-    {"symbol": "MYL3",  "name": "Myosin Light Chain 3",       "disease": "HCM",
-     "variant": {"chrom": "chr3",  "pos": 46900000,   "ref": "A", "alt": "G"}},
-]
-
-if selected_page == "Gene Panel":
-    st.markdown("<div class='section-title'>Gene Panel</div>", unsafe_allow_html=True)
-    st.markdown("<div class='section-sub'>Pre-loaded pathogenic variants for key cardiovascular disease genes.</div>", unsafe_allow_html=True)
+elif selected_page == "Gene Panel":
+    page_header("Gene Panel", "Pre-loaded pathogenic variants for key cardiovascular disease genes.")
 
     cols = st.columns(3)
-    for i, gene in enumerate(GENE_PANEL):
-        v = gene["variant"]
+    for i, (gene, card_html) in enumerate(zip(GENE_PANEL, gene_cards_html())):
         with cols[i % 3]:
-            st.markdown(f"""
-            <div class='gene-card'>
-                <div style='font-size:20px;font-weight:800;color:{COLORS["primary"]};'>{gene['symbol']}</div>
-                <div style='font-size:13px;color:{COLORS["text_dark"]};font-weight:500;margin:4px 0;'>{gene['name']}</div>
-                <div style='font-size:11px;color:{COLORS["text_light"]};margin-bottom:10px;'>🫀 {gene['disease']}</div>
-                <div style='font-size:11px;font-family:monospace;background:#F4F5F7;padding:6px 10px;border-radius:6px;'>
-                    {v['chrom']}:{v['pos']:,} {v['ref']}→{v['alt']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(card_html, unsafe_allow_html=True)
             if st.button(f"Analyze {gene['symbol']}", key=f"gene_btn_{gene['symbol']}",
                          use_container_width=True):
                 st.session_state.inputs.update(gene["variant"])
@@ -578,11 +700,13 @@ if selected_page == "Gene Panel":
 # ══════════════════════════════════════════════════════════════════════════════
 # Page: Benchmarking
 # ══════════════════════════════════════════════════════════════════════════════
-if selected_page == "Benchmarking":
-    st.markdown("<div class='section-title'>Batch Analysis</div>", unsafe_allow_html=True)
-    st.markdown("<div class='section-sub'>Upload a CSV (`chrom,pos,ref,alt`) or VCF file.</div>", unsafe_allow_html=True)
+elif selected_page == "Benchmarking":
+    import pandas as pd
+    from vcf_parser import BATCH_DTYPES, parse_vcf, read_batch_csv
+
+    page_header("Batch Analysis", "Upload a CSV (`chrom,pos,ref,alt`) or VCF file.")
 
-    st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     bc1, bc2 = st.columns([3, 1])
     with bc1:
         uploaded_file = st.file_uploader("Choose File", type=["csv", "vcf"])
@@ -598,51 +722,78 @@ if selected_page == "Benchmarking":
         if st.button("▶ Process Batch"):
             try:
                 if uploaded_file.name.endswith(".vcf"):
-                    from vcf_parser import parse_vcf
                     df = parse_vcf(uploaded_file.getvalue().decode("utf-8"))
                     st.info(f"Parsed {len(df)} variants from VCF.")
                 else:
-                    df = pd.read_csv(uploaded_file)
+                    df = read_batch_csv(uploaded_file)
 
-                required_cols = {"chrom", "pos", "ref", "alt"}
-                if not required_cols.issubset(df.columns):
-                    st.error(f"Missing columns: {required_cols - set(df.columns)}")
+                missing = set(BATCH_DTYPES) - set(df.columns)
+                if missing:
+                    st.error(f"Missing columns: {', '.join(sorted(missing))}")
                 else:
-                    variants = df.to_dict(orient="records")
+                    batch_id = None
                     with st.spinner("Starting batch job…"):
-                        bres = requests.post(f"{API_URL}/batch-start", json={"variants": variants})
-                        bres.raise_for_status()
-                        batch_id = bres.json()["batch_id"]
+                        # pandas serializes the records in C; no intermediate list of dicts
+                        body = '{"variants":' + df[list(BATCH_DTYPES)].to_json(orient="records") + "}"
+                        bres = api_session().post(f"{API_URL}/batch-start", data=body.encode(),
+                                                  headers={"Content-Type": "application/json"})
+                        if bres.ok:
+                            batch_id = bres.json()["batch_id"]
 
                     pb = st.progress(0)
                     st_txt = st.empty()
-                    while True:
-                        status = requests.get(f"{API_URL}/batch-status/{batch_id}").json()
-                        if status["total"] > 0:
-                            pb.progress(status["processed"] / status["total"])
-                            st_txt.text(f"Processed {status['processed']}/{status['total']}")
-                        if status["status"] in ["completed", "failed"]:
-                            break
-                        time.sleep(1)
-
-                    if status["status"] == "completed":
+
+                    def show_progress(processed, total):
+                        if total > 0:
+                            pb.progress(processed / total)
+                            st_txt.text(f"Processed {processed}/{total}")
+
+                    status = {}
+                    if batch_id:
+                        # Server-Sent Events: a `result` per scored variant, then `done`
+                        with api_session().get(f"{API_URL}/batch-stream/{batch_id}",
+                                          stream=True, timeout=(5, None)) as sresp:
+                            sresp.raise_for_status()
+                            event = None
+                            for line in sresp.iter_lines(decode_unicode=True):
+                                if line.startswith("event: "):
+                                    event = line[7:]
+                                elif line.startswith("data: "):
+                                    msg = json.loads(line[6:])
+                                    if event == "result":
+                                        show_progress(msg["processed"], msg["total"])
+                                    elif event == "done":
+                                        status = msg
+                    else:
+                        # Batch endpoint unavailable — fan out single-variant calls
+                        st.info(f"Batch endpoint unavailable (HTTP {bres.status_code}); scoring variants individually.")
+                        results = fanout_variant_impact(df[list(BATCH_DTYPES)].to_dict(orient="records"),
+                                                        on_progress=show_progress)
+                        status = {"status": "completed", "results": results}
+
+                    if status.get("status") == "completed":
                         res_df = pd.DataFrame(status["results"])
-                        st.dataframe(res_df, use_container_width=True)
+                        styled = res_df.style
+                        if "priority" in res_df.columns:
+                            # One dict-backed Series.map over the column, not a lambda per cell
+                            styled = styled.apply(lambda col: col.map(PRIORITY_STYLES).fillna(""),
+                                                  subset=["priority"])
+                        st.dataframe(styled, use_container_width=True)
                         st.download_button("⬇ Download CSV", res_df.to_csv(index=False).encode(),
                                            "batch_results.csv", "text/csv")
             except Exception as e:
                 st.error(f"Batch error: {e}")
-    st.markdown("</div>", unsafe_allow_html=True)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # Page: MSA Explorer
 # ══════════════════════════════════════════════════════════════════════════════
-if selected_page == "MSA Explorer":
-    st.markdown("<div class='section-title'>MSA Explorer</div>", unsafe_allow_html=True)
-    st.markdown("<div class='section-sub'>Visualize conservation and sequence diversity from FASTA alignments.</div>", unsafe_allow_html=True)
+elif selected_page == "MSA Explorer":
+    import plotly.graph_objects as go
+
+    page_header("MSA Explorer", "Visualize conservation and sequence diversity from FASTA alignments.")
 
-    st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     mc1, mc2 = st.columns([3, 1])
     with mc1:
         uploaded_msa = st.file_uploader("Upload FASTA Alignment", type=["fasta", "fa", "txt"])
@@ -657,58 +808,57 @@ if selected_page == "MSA Explorer":
     if uploaded_msa:
         try:
             from msaexplorer.explore import MSA
-            import msaexplorer.draw as msa_draw
-            import matplotlib.pyplot as plt
 
-            content = uploaded_msa.getvalue().decode("utf-8")
+            raw = uploaded_msa.getvalue()
+            try:
+                content = raw.decode("ascii")  # FASTA is ASCII; cheaper than utf-8
+            except UnicodeDecodeError:
+                content = raw.decode("utf-8")
+            del raw
             msa = MSA(content)
             st.success(f"Loaded alignment — {len(msa.alignment)} sequences × {msa.length} positions")
 
             msa_seq, msa_sim, msa_stat = st.tabs(["Sequence Similarity", "Statistics", "Shannon Entropy"])
 
             with msa_seq:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                fig, ax = plt.subplots(figsize=(12, 5))
-                msa_draw.similarity_alignment(msa, ax=ax)
-                ax.set_title("Sequence Similarity Matrix", fontsize=13, fontweight="bold")
-                st.pyplot(fig, use_container_width=True)
-                st.markdown("</div>", unsafe_allow_html=True)
+                st.markdown(CARD_OPEN, unsafe_allow_html=True)
+                st.image(msa_figure_png(content, "similarity"), use_container_width=True)
 
             with msa_stat:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                fig2, ax2 = plt.subplots(figsize=(12, 4))
-                msa_draw.stat_plot(msa, stat_type="identity", ax=ax2)
-                ax2.set_title("Per-Position Identity", fontsize=13, fontweight="bold")
-                st.pyplot(fig2, use_container_width=True)
-                st.markdown("</div>", unsafe_allow_html=True)
+                st.markdown(CARD_OPEN, unsafe_allow_html=True)
+                st.image(msa_figure_png(content, "identity"), use_container_width=True)
 
             with msa_stat:
-                st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-                st.markdown("**Sequence Diversity (Shannon Entropy)**")
+                st.markdown(CARD_OPEN + "\n\n**Sequence Diversity (Shannon Entropy)**", unsafe_allow_html=True)
                 st.markdown("")
 
-                entropy_vals = []
-                for i in range(msa.length):
-                    col_res = [seq.seq[i] for seq in msa.alignment if i < len(seq.seq)]
-                    counts  = collections.Counter(col_res)
-                    total   = len(col_res)
-                    H = -sum((c / total) * math.log2(c / total) for c in counts.values() if c > 0)
-                    entropy_vals.append(H)
-
-                max_h = math.log2(4) if entropy_vals else 2  # max for DNA (4 states)
-                colors_ent = [
-                    f"rgba({int(244*(h/max_h))},{int(96*(1-h/max_h))},{int(54*(1-h/max_h))},0.85)"
-                    for h in entropy_vals
-                ]
+                # Encode each record once; the entropy pass works on raw bytes
+                raws = tuple(str(seq.seq).encode("latin-1") for seq in msa.alignment)
+                H = shannon_entropy(raws, msa.length)
+                if H.size > ENTROPY_MAX_COLUMNS:
+                    # Long alignments: mean entropy per window, ~ENTROPY_BARS bars
+                    import numpy as np
+                    step = H.size // ENTROPY_BARS
+                    starts = np.arange(0, H.size, step)
+                    H = np.add.reduceat(H, starts) / np.diff(np.append(starts, msa.length))
+                    xs, ends = starts + 1, np.minimum(starts + step, msa.length)
+                    hover = "Positions %{x}–%{customdata}: mean H=%{y:.3f} bits<extra></extra>"
+                else:
+                    xs, ends = list(range(1, msa.length + 1)), None
+                    hover = "Position %{x}: H=%{y:.3f} bits<extra></extra>"
+                entropy_vals = H.tolist()
 
                 fig_ent = go.Figure(go.Bar(
-                    x=list(range(1, msa.length + 1)),
+                    x=xs,
                     y=entropy_vals,
-                    marker_color=colors_ent,
+                    customdata=ends,
+                    # Colour ramp interpolated by Plotly: conserved green → variable red
+                    marker=dict(color=entropy_vals, cmin=0, cmax=MAX_ENTROPY_DNA,
+                                colorscale=[[0, "rgba(0,96,54,0.85)"], [1, "rgba(244,0,0,0.85)"]]),
                     name="Shannon Entropy",
-                    hovertemplate="Position %{x}: H=%{y:.3f} bits<extra></extra>",
+                    hovertemplate=hover,
                 ))
-                fig_ent.add_hline(y=max_h, line_dash="dot", line_color="#888DA7",
+                fig_ent.add_hline(y=MAX_ENTROPY_DNA, line_dash="dot", line_color="#888DA7",
                                   annotation_text="Max entropy (4 states)",
                                   annotation_position="top right")
                 fig_ent.update_layout(
@@ -719,90 +869,67 @@ if selected_page == "MSA Explorer":
                     plot_bgcolor="rgba(0,0,0,0)",
                     font=dict(family="Inter, sans-serif"),
                 )
-                st.plotly_chart(fig_ent, use_container_width=True)
-                st.markdown("</div>", unsafe_allow_html=True)
+                st.plotly_chart(fig_ent, use_container_width=True, config=PLOTLY_CONFIG, key="plot_msa_entropy")
 
         except Exception as e:
             st.error(f"MSA error: {e}")
-    st.markdown("</div>", unsafe_allow_html=True)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # Page: Report
 # ══════════════════════════════════════════════════════════════════════════════
-if selected_page == "Report":
-    st.markdown("<div class='section-title'>Variant Report Generator</div>", unsafe_allow_html=True)
-    st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
+elif selected_page == "Report":
+    page_header("Variant Report Generator")
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
 
     if st.session_state.analysis_results:
         data    = st.session_state.analysis_results
         metrics = data.get("metrics", {})
         gene    = data.get("gene", {})
+        inp     = st.session_state.inputs
+        chrom, pos, ref, alt = inp["chrom"], inp["pos"], inp["ref"], inp["alt"]
 
         st.success(f"Ready to generate report — {metrics.get('gene_symbol')} {chrom}:{pos} {ref}→{alt}")
 
         if st.button("📄 Generate HTML Report"):
             try:
-                _, label, _ = plot_evidence_stack(data)
+                _, label, _ = cached_plot("evidence_stack", payload_digest(data), data)
             except Exception:
                 label = "VUS"
 
-            html = f"""<!DOCTYPE html>
-<html><head><meta charset="utf-8">
-<title>CardioVar Report — {metrics.get('gene_symbol')}</title>
-<style>
-  body{{font-family:Inter,sans-serif;padding:40px;max-width:860px;margin:auto;color:#171123;}}
-  h1{{color:#F46036;border-bottom:3px solid #F46036;padding-bottom:10px;}}
-  h2{{color:#5B85AA;margin-top:28px;}}
-  .badge{{display:inline-block;padding:5px 16px;border-radius:16px;font-weight:700;font-size:13px;background:#fee;color:#c44027;border:1.5px solid #c44027;}}
-  table{{width:100%;border-collapse:collapse;margin-top:14px;}}
-  th,td{{border:1px solid #ddd;padding:8px 12px;text-align:left;font-size:13px;}}
-  th{{background:#f7f7f7;font-weight:600;}}
-  .footer{{margin-top:40px;font-size:11px;color:#888;border-top:1px solid #eee;padding-top:12px;}}
-</style></head><body>
-<h1>CardioVar Variant Report</h1>
-<p>Generated: {time.strftime("%Y-%m-%d %H:%M")} UTC | Model: {metrics.get("model_used","N/A")}</p>
-<span class='badge'>{label}</span>
-<h2>Variant Summary</h2>
-<table>
-<tr><th>Field</th><th>Value</th></tr>
-<tr><td>Variant ID</td><td>{chrom}:{pos} {ref}&gt;{alt}</td></tr>
-<tr><td>Gene</td><td>{metrics.get("gene_symbol","N/A")}</td></tr>
-<tr><td>Assembly</td><td>GRCh38</td></tr>
-<tr><td>Max Impact (|Δ|)</td><td>{abs(metrics.get("max_delta",0)):.4f}</td></tr>
-<tr><td>Z-Score</td><td>{metrics.get("z_score",0):.2f}</td></tr>
-<tr><td>Percentile</td><td>{metrics.get("percentile",0):.1f}%</td></tr>
-<tr><td>gnomAD Allele Frequency</td><td>{metrics.get("gnomad_freq",0):.2e}</td></tr>
-<tr><td>Model Confidence</td><td>{metrics.get("confidence",0):.0f}%</td></tr>
-</table>
-<h2>Gene Information</h2>
-<p><b>Name:</b> {gene.get("name","N/A")}<br>
-<b>Biotype:</b> {gene.get("biotype","N/A")}<br>
-<b>Description:</b> {gene.get("description","N/A")}</p>
-<h2>Disclaimer</h2>
-<p>This report is generated by CardioVar for <strong>research purposes only</strong>. It does not constitute clinical advice. Always consult a certified clinical geneticist for patient-facing interpretation.</p>
-<div class='footer'>CardioVar v1.2.0 · Enformer · GRCh38 · Generated {time.strftime("%Y-%m-%d")}</div>
-</body></html>"""
-            b64 = base64.b64encode(html.encode()).decode()
-            href = f'<a href="data:text/html;base64,{b64}" download="cardiovar_report_{metrics.get("gene_symbol","variant")}.html" style="text-decoration:none;background:{COLORS["primary"]};color:white;padding:10px 22px;border-radius:9px;font-weight:600;">⬇ Download HTML Report</a>'
-            st.markdown(href, unsafe_allow_html=True)
+            report_html = report_template().substitute(
+                gene_symbol=metrics.get("gene_symbol", "N/A"),
+                generated=time.strftime("%Y-%m-%d %H:%M"),
+                generated_date=time.strftime("%Y-%m-%d"),
+                model=metrics.get("model_used", "N/A"),
+                label=label,
+                variant_id=f"{chrom}:{pos} {ref}&gt;{alt}",
+                max_delta=f"{abs(metrics.get('max_delta', 0)):.4f}",
+                z_score=f"{metrics.get('z_score', 0):.2f}",
+                percentile=f"{metrics.get('percentile', 0):.1f}",
+                gnomad_freq=f"{metrics.get('gnomad_freq', 0):.2e}",
+                confidence=f"{metrics.get('confidence', 0):.0f}",
+                gene_name=gene.get("name", "N/A"),
+                gene_biotype=gene.get("biotype", "N/A"),
+                gene_description=gene.get("description", "N/A"),
+            )
+            st.download_button("⬇ Download HTML Report", data=report_html.encode("utf-8"),
+                               file_name=f"cardiovar_report_{metrics.get('gene_symbol', 'variant')}.html",
+                               mime="text/html")
     else:
         st.info("No analysis results. Please run an analysis in the **Inference** tab first.")
-    st.markdown("</div>", unsafe_allow_html=True)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # Page: Models / About
 # ══════════════════════════════════════════════════════════════════════════════
-if selected_page == "Models":
-    st.markdown("<div class='section-title'>About CardioVar</div>", unsafe_allow_html=True)
-    st.markdown("<div class='section-sub'>Precision genomics platform for cardiovascular disease variant interpretation.</div>", unsafe_allow_html=True)
+elif selected_page == "Models":
+    page_header("About CardioVar", "Precision genomics platform for cardiovascular disease variant interpretation.")
 
     ab1, ab2 = st.columns(2)
     with ab1:
-        st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-        st.markdown("### 📘 How to Use")
-        st.markdown("""
+        card_markdown("""### 📘 How to Use
+
 **1. Inference** — Enter a GRCh38 variant or load a demo. Enformer predicts regulatory impact across 5,313 genomic assay tracks.
 
 **2. Gene Panel** — Click any cardio gene to pre-fill a canonical pathogenic variant; analysis starts immediately.
@@ -813,12 +940,10 @@ if selected_page == "Models":
 
 **5. Report** — Generate a downloadable HTML report after running inference.
         """)
-        st.markdown("</div>", unsafe_allow_html=True)
 
     with ab2:
-        st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-        st.markdown("### 🧠 Models & Methods")
-        st.markdown("""
+        card_markdown("""### 🧠 Models & Methods
+
 | Component | Method |
 |:---|:---|
 | **Impact model** | Enformer (Avsec et al. 2021, *Nature Genetics*) |
@@ -828,25 +953,22 @@ if selected_page == "Models":
 | **Entropy** | Shannon entropy from FASTA MSA |
 | **Pathogenicity** | Multi-evidence heuristic |
         """)
-        st.markdown("</div>", unsafe_allow_html=True)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # Page: Settings
 # ══════════════════════════════════════════════════════════════════════════════
-if selected_page == "Settings":
-    st.markdown("<div class='section-title'>Settings</div>", unsafe_allow_html=True)
-    st.markdown("<div class='cv-card'>", unsafe_allow_html=True)
-    st.markdown("### Backend Status")
+elif selected_page == "Settings":
+    page_header("Settings")
+    st.markdown(CARD_OPEN + "\n\n### Backend Status", unsafe_allow_html=True)
     if st.button("🔗 Check API Connectivity"):
         try:
-            resp = requests.get(f"{API_URL}/system-status", timeout=5)
-            if resp.status_code == 200:
+            status, body = fetch_system_status()
+            if status == 200:
                 st.success("API Online ✓")
-                st.json(resp.json())
+                st.json(body)
             else:
-                st.error(f"API Error: HTTP {resp.status_code}")
+                st.error(f"API Error: HTTP {status}")
         except Exception as e:
             st.error(f"Connection failed: {e}")
     st.markdown(f"API URL: `{API_URL}`")
-    st.markdown("</div>", unsafe_allow_html=True)
@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 import torch
 import numpy as np
 from enformer_pytorch import Enformer
@@ -5,23 +7,50 @@ from api_integrations import fetch_genomic_sequence
 
 # Global model instance to avoid reloading
 _MODEL = None
+# Uncompiled module behind a torch.compile'd _MODEL, kept so a compile failure
+# (which only surfaces on the first forward pass) can fall back to eager mode
+_EAGER_MODEL = None
+
+# Reference-sequence predictions ('human' head, CPU numpy) keyed by the input
+# window: every alt allele at a site (and any rescoring of it) shares the same
+# reference, so only the alt sequence needs a forward pass. Kept small; each
+# entry is ~18 MB.
+_REF_CACHE = OrderedDict()
+_REF_CACHE_MAXSIZE = 8
 
 def get_model():
-    global _MODEL
+    global _MODEL, _EAGER_MODEL
     if _MODEL is None:
         print(">> Loading Enformer model (this may take a moment)...")
         try:
             # Load pre-trained Enformer
             _MODEL = Enformer.from_pretrained('EleutherAI/enformer-official-rough')
             
-            # Move to GPU if available
+            # Move to GPU if available, with half-precision weights (bf16 where
+            # supported, else fp16); the CPU path keeps fp32
             if torch.cuda.is_available():
-                _MODEL = _MODEL.cuda()
-                print(f">> Using GPU: {torch.cuda.get_device_name(0)}")
+                half = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+                _MODEL = _MODEL.cuda().to(dtype=half)
+                print(f">> Using GPU: {torch.cuda.get_device_name(0)} ({half})")
             else:
                 print(">> Using CPU (GPU not available)")
             
-            _MODEL.eval()  # Set to evaluation mode
+            _MODEL.eval()  # Set to evaluation mode (disables dropout)
+            _MODEL.requires_grad_(False)
+            
+            # The input length is fixed, so compiled graphs specialise on the
+            # batch size alone and are replayed as CUDA graphs. Batches hold
+            # 1 to 2x batch_size rows (plus 1-row OOM retries); each distinct
+            # size compiles and captures once. That bounded one-off cost is
+            # accepted rather than padding batches, since every padding row
+            # would cost a full forward pass. Compilation itself is lazy, so
+            # failures are handled on first use in _forward.
+            if torch.cuda.is_available() and hasattr(torch, "compile"):
+                try:
+                    compiled = torch.compile(_MODEL, mode="reduce-overhead", dynamic=False)
+                    _EAGER_MODEL, _MODEL = _MODEL, compiled
+                except Exception as e:
+                    print(f">> torch.compile unavailable, using eager model: {e}")
             print(">> Enformer model loaded successfully")
         except Exception as e:
             print(f">> Failed to load Enformer: {e}")
@@ -30,40 +59,117 @@ def get_model():
 
 
 
+# ASCII byte -> channel (A, C, G, T = 0..3, either case); everything else
+# (N, gaps, unknown bases) -> 4, which encodes as an all-zero row
+_BASE_INDEX = np.full(256, 4, dtype=np.uint8)
+_BASE_INDEX[np.frombuffer(b"ACGTacgt", dtype=np.uint8)] = [0, 1, 2, 3, 0, 1, 2, 3]
+
+def encode_indices(seq, out=None):
+    """
+    Convert DNA sequence to uint8 base indices (A, C, G, T = 0..3; N/unknown = 4).
+    
+    Args:
+        seq: DNA sequence string
+        out: optional uint8 array of len(seq) to write into (e.g. a view of a
+            pinned tensor), avoiding a separate allocation and copy
+    """
+    return np.take(_BASE_INDEX, np.frombuffer(seq.encode("ascii", "replace"), dtype=np.uint8), out=out)
+
+
 def one_hot_encode(seq):
     """Convert DNA sequence to one-hot encoding for Enformer."""
-    mapping = {'A': 0, 'C': 1, 'G': 2, 'T': 3, 'N': 4}
-    seq = seq.upper()
-    
-    # Create one-hot matrix
-    one_hot = np.zeros((len(seq), 4), dtype=np.float32)
-    for i, nucleotide in enumerate(seq):
-        if nucleotide in mapping and mapping[nucleotide] < 4:
-            one_hot[i, mapping[nucleotide]] = 1.0
-        # N or unknown nucleotides get all zeros
+    # Row 4 of eye(5, 4) is all zeros: N or unknown nucleotides
+    return np.eye(5, 4, dtype=np.float32)[encode_indices(seq)]
+
+
+def _forward(model, batch_tensor):
+    """
+    Forward pass, falling back to the eager model if the compiled one fails.
     
-    return one_hot
+    torch.compile defers Dynamo/Inductor/CUDA-graph work to the first call
+    (and to the first call at each new batch size), so errors surface here
+    rather than in get_model. On failure _MODEL is swapped back to the eager
+    module for this and every later call.
+    """
+    global _MODEL
+    if _EAGER_MODEL is None or model is _EAGER_MODEL:
+        return model(batch_tensor)
+    if _MODEL is _EAGER_MODEL:
+        # An earlier call already fell back; callers may still hold the
+        # compiled module from before the swap
+        return _EAGER_MODEL(batch_tensor)
+    try:
+        return model(batch_tensor)
+    except torch.cuda.OutOfMemoryError:
+        raise
+    except Exception as e:
+        print(f">> Compiled Enformer failed, falling back to eager model: {e}")
+    _MODEL = _EAGER_MODEL
+    return _EAGER_MODEL(batch_tensor)
 
 
-def predict_variant_impact_dl(chrom, pos, ref, alt):
+def _predict_human(model, indices):
     """
-    Predict variant impact using Enformer deep learning model.
+    Run Enformer on a (batch, seq_len) uint8 base-index CPU tensor.
     
-    Args:
-        chrom: Chromosome (e.g., "chr22")
-        pos: Genomic position
-        ref: Reference allele
-        alt: Alternate allele
+    Returns:
+        float32 numpy array (batch, 896, 5313) from the 'human' head; all
+        device tensors are released before returning.
+    """
+    # Ship base indices (1 byte/base) rather than float32 one-hot (16 bytes/base)
+    # and expand them on the model's device, in the weights' dtype. On GPU the
+    # host copy is pinned so the transfer is a single async DMA, ordered before
+    # the forward pass on the same stream.
+    param = next(model.parameters())
+    device = param.device
+    use_amp = device.type == "cuda"
+    idx_tensor = indices
+    if use_amp and not idx_tensor.is_pinned():
+        idx_tensor = idx_tensor.pin_memory()
+    idx_tensor = idx_tensor.to(device, non_blocking=use_amp)
+    one_hot_table = torch.eye(5, 4, device=device, dtype=param.dtype)
+    
+    # On GPU, autocast (in the weights' half dtype) keeps precision-sensitive
+    # ops such as softmax and normalization in fp32; CPU stays in fp32
+    with torch.inference_mode(), torch.autocast(device_type=device.type, dtype=param.dtype, enabled=use_amp):
+        batch_tensor = one_hot_table[idx_tensor.long()]  # (batch, seq_len, 4)
+        pred = _forward(model, batch_tensor)
+    
+    # Enformer returns dictionary with 'human' and 'mouse' heads; keep 'human'
+    # Move to CPU for numpy operations (numpy has no bf16, so upcast first)
+    human = pred['human'].float().cpu().numpy()
+    del pred, batch_tensor, idx_tensor
+    if use_amp:
+        torch.cuda.empty_cache()
+    return human
+
+
+# Enformer requires 196,608 bp context
+SEQUENCE_LENGTH = 196_608
+
+
+def _predict_rows(model, batch):
+    """_predict_human over a batch, retrying row by row if the GPU runs out of memory."""
+    try:
+        return _predict_human(model, batch)
+    except torch.cuda.OutOfMemoryError:
+        pass
+    # Each row at full context needs ~14 GB of activations, so a batch can
+    # exceed smaller GPUs; run the rows one at a time. This runs outside the
+    # except block so the failed attempt's traceback, and the tensors it
+    # references, are already released.
+    print(">> GPU out of memory for batched inference; running sequences separately")
+    torch.cuda.empty_cache()
+    return np.concatenate([_predict_human(model, batch[i:i+1]) for i in range(len(batch))])
+
+
+def _prepare_variant(chrom, pos, ref, alt):
+    """
+    Fetch the reference window for a variant and check that it can be scored.
     
     Returns:
-        Dict with raw_delta, center_idx, max_impact or None if failed
+        (ref_key, ref_seq, rel_pos) or None if the variant can't be scored
     """
-    model = get_model()
-    if model is None:
-        return None
-        
-    # Enformer requires 196,608 bp context
-    SEQUENCE_LENGTH = 196_608
     start = pos - (SEQUENCE_LENGTH // 2)
     end = start + SEQUENCE_LENGTH
     
@@ -75,7 +181,7 @@ def predict_variant_impact_dl(chrom, pos, ref, alt):
         print(f">> Failed to fetch correct sequence length. Got {len(ref_seq) if ref_seq else 0}")
         return None
         
-    # 2. Create Alternate Sequence
+    # 2. Locate the alternate allele
     # Calculate relative position of variant within the fetched sequence
     rel_pos = SEQUENCE_LENGTH // 2  # Variant is at center of sequence
     
@@ -85,44 +191,24 @@ def predict_variant_impact_dl(chrom, pos, ref, alt):
         print(f">> Reference mismatch! Expected {ref}, got {fetched_ref}")
         # Continue anyway for demo, but warn
     
-    # ... (alt seq construction) ...
-    if len(ref) == len(alt):
-        alt_seq = ref_seq[:rel_pos] + alt + ref_seq[rel_pos+len(ref):]
-    else:
+    # The alt sequence is the reference with the allele substituted in place
+    if len(ref) != len(alt):
         print(">> Indels not fully supported in this demo version")
         return None
+    
+    return (chrom, start), ref_seq, rel_pos
 
 
-    # 3. One-hot encode sequences
-    ref_encoded = one_hot_encode(ref_seq)
-    alt_encoded = one_hot_encode(alt_seq)
-    
-    # Convert to torch tensors and add batch dimension
-    ref_tensor = torch.from_numpy(ref_encoded).unsqueeze(0)  # (1, seq_len, 4)
-    alt_tensor = torch.from_numpy(alt_encoded).unsqueeze(0)
-    
-    # Move tensors to same device as model (CPU or GPU)
-    device = next(model.parameters()).device
-    ref_tensor = ref_tensor.to(device)
-    alt_tensor = alt_tensor.to(device)
-    
-    # 4. Run Prediction
-    print(">> Running Enformer inference...")
-    with torch.no_grad():
-        ref_pred = model(ref_tensor)
-        alt_pred = model(alt_tensor)
-        
-    # Enformer returns dictionary with 'human' and 'mouse' heads
-    # We want 'human' head
-    # Shape: (batch, seq_len, tracks) -> (1, 896, 5313)
-    
-    # Move to CPU for numpy operations
-    ref_human = ref_pred['human'].cpu().numpy()[0]
-    alt_human = alt_pred['human'].cpu().numpy()[0]
-    
-    # 5. Calculate Impact (L1 norm of difference across all tracks)
+def _impact_from_predictions(alt_human, ref_human):
+    """
+    Step 5: ΔRNA-seq profile from the alt and reference 'human' predictions.
+    alt_human must be a buffer owned by the caller; it is overwritten.
+    """
+    # Calculate Impact (L1 norm of difference across all tracks)
     # This gives us a profile of change across the 896 bins (each bin ~128bp)
-    delta_profile = np.abs(alt_human - ref_human).mean(axis=1) # Mean across tracks
+    # |alt - ref| is formed in place rather than through two (896, 5313) temporaries
+    diff = np.subtract(alt_human, ref_human, out=alt_human)
+    delta_profile = np.abs(diff, out=diff).mean(axis=1) # Mean across tracks
     
     # Center is the variant position
     center_idx = len(delta_profile) // 2
@@ -136,3 +222,97 @@ def predict_variant_impact_dl(chrom, pos, ref, alt):
         "center_idx": center_idx,
         "max_impact": np.max(delta_profile)
     }
+
+
+def predict_variant_impacts_dl(variants, batch_size=4):
+    """
+    Predict impact for many variants, sharing Enformer forward passes.
+    
+    Each mini-batch of variants becomes one model batch: one row per distinct
+    reference window not already in _REF_CACHE, then one row per alt.
+    
+    Args:
+        variants: Sequence of (chrom, pos, ref, alt) tuples
+        batch_size: Variants per forward pass (a batch holds up to twice as
+            many sequences, at ~14 GB of activations each on GPU)
+    
+    Returns:
+        List aligned with variants: dict with raw_delta, center_idx,
+        max_impact, or None for variants that could not be scored
+    """
+    variants = list(variants)
+    results = [None] * len(variants)
+    model = get_model()
+    if model is None:
+        return results
+    
+    for b0 in range(0, len(variants), batch_size):
+        prepared = []  # (variant index, ref_key, ref_seq, rel_pos, alt)
+        for i in range(b0, min(b0 + batch_size, len(variants))):
+            ready = _prepare_variant(*variants[i])
+            if ready:
+                prepared.append((i, *ready, variants[i][3]))
+        if not prepared:
+            continue
+        
+        # 3. Encode sequences as one batch of base indices (one-hot expansion
+        # happens on the device): uncached references first, then the alts.
+        # Each alt row is a copy of its reference with only the allele redone.
+        # Rows are encoded straight into a (pinned, on GPU) torch buffer via
+        # its numpy view, so nothing is copied again before the transfer.
+        cached_refs = {key: _REF_CACHE[key] for _, key, *_ in prepared if key in _REF_CACHE}
+        ref_seqs = {}  # ref_key -> ref_seq, for references that need a forward pass
+        for _, key, ref_seq, _, _ in prepared:
+            if key not in cached_refs:
+                ref_seqs.setdefault(key, ref_seq)
+        ref_rows = {key: row for row, key in enumerate(ref_seqs)}
+        n_ref = len(ref_rows)
+        batch = torch.empty((n_ref + len(prepared), SEQUENCE_LENGTH), dtype=torch.uint8,
+                            pin_memory=next(model.parameters()).is_cuda)
+        encoded = batch.numpy()  # (rows, seq_len)
+        for key, ref_seq in ref_seqs.items():
+            encode_indices(ref_seq, out=encoded[ref_rows[key]])
+        for j, (_, key, ref_seq, rel_pos, alt) in enumerate(prepared):
+            row = n_ref + j
+            if key in ref_rows:
+                encoded[row] = encoded[ref_rows[key]]
+            else:
+                encode_indices(ref_seq, out=encoded[row])
+            encode_indices(alt, out=encoded[row, rel_pos:rel_pos+len(alt)])
+        
+        # 4. Run Prediction (single forward pass over the batch)
+        print(f">> Running Enformer inference ({len(prepared)} variants, {len(batch)} sequences)...")
+        human = _predict_rows(model, batch)
+        del batch, encoded
+        
+        # 5. Score each alt against its reference, then cache new references
+        # (copied so the cache doesn't pin the whole prediction buffer)
+        new_refs = {key: human[row].copy() for key, row in ref_rows.items()}
+        for j, (i, key, _, _, _) in enumerate(prepared):
+            ref_human = new_refs[key] if key in new_refs else cached_refs[key]
+            results[i] = _impact_from_predictions(human[n_ref + j], ref_human)
+        for key in {p[1] for p in prepared}:
+            if key in new_refs:
+                _REF_CACHE[key] = new_refs[key]
+            if key in _REF_CACHE:
+                _REF_CACHE.move_to_end(key)
+        while len(_REF_CACHE) > _REF_CACHE_MAXSIZE:
+            _REF_CACHE.popitem(last=False)
+    
+    return results
+
+
+def predict_variant_impact_dl(chrom, pos, ref, alt):
+    """
+    Predict variant impact using Enformer deep learning model.
+    
+    Args:
+        chrom: Chromosome (e.g., "chr22")
+        pos: Genomic position
+        ref: Reference allele
+        alt: Alternate allele
+    
+    Returns:
+        Dict with raw_delta, center_idx, max_impact or None if failed
+    """
+    return predict_variant_impacts_dl([(chrom, pos, ref, alt)])[0]
@@ -12,10 +12,16 @@ Run this periodically (weekly/monthly) to update the database.
 """
 
 import json
+import multiprocessing as mp
+import os
 import numpy as np
-from variant_engine import compute_variant_impact
+import psutil
+from variant_engine import compute_variant_impact_batch
 from api_integrations import fetch_ensembl_gene
 import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 # Top cardiovascular genes (expand this list as needed)
@@ -66,29 +72,73 @@ def generate_synthetic_variants_for_gene(gene_symbol, count=50):
     if not chrom.startswith('chr'):
         chrom = f'chr{chrom}'
     
-    variants = []
-    
     # Generate random positions within gene
-    np.random.seed(hash(gene_symbol) % 2**32)  # Deterministic per gene
-    positions = np.random.randint(start, end, count)
-    
-    # Simple SNVs (single nucleotide variants)
-    bases = ['A', 'C', 'G', 'T']
-    
-    for pos in positions:
-        ref = np.random.choice(bases)
-        alt = np.random.choice([b for b in bases if b != ref])
-        
-        variants.append({
-            'chrom': chrom,
-            'pos': int(pos),
-            'ref': ref,
-            'alt': alt
-        })
+    # Deterministic per gene: crc32 is stable across runs and processes,
+    # unlike str hash() which is salted per interpreter
+    rng = np.random.default_rng(zlib.crc32(gene_symbol.encode()))
+    positions = rng.integers(start, end, count)
+    
+    # Simple SNVs (single nucleotide variants); a 1-3 offset keeps alt != ref
+    bases = np.array(['A', 'C', 'G', 'T'])
+    ref_idx = rng.integers(0, 4, count)
+    alt_idx = (ref_idx + rng.integers(1, 4, count)) % 4
+    
+    variants = [
+        {'chrom': chrom, 'pos': int(pos), 'ref': str(ref), 'alt': str(alt)}
+        for pos, ref, alt in zip(positions, bases[ref_idx], bases[alt_idx])
+    ]
     
     return variants
 
-def compute_background_for_gene(gene_symbol, variant_count=50, use_enformer=True):
+# Variants per task: each task is one batched Enformer call in a worker
+ENFORMER_BATCH_SIZE = 4
+
+# RAM budget per CPU worker: its own Enformer weights (~1 GB fp32) plus the
+# activations of a batch at full 196 kb context
+CPU_WORKER_MEMORY_GB = 8
+
+def _impact_worker(start_idx, chunk):
+    """
+    Compute |max_delta| for a chunk of variants (runs in a worker process).
+    
+    Returns:
+        List of (idx, impact) with impact None where the variant failed
+    """
+    results = compute_variant_impact_batch(chunk, batch_size=ENFORMER_BATCH_SIZE)
+    return [(start_idx + i, None if r is None else abs(r['metrics']['max_delta']))
+            for i, r in enumerate(results)]
+
+def _pin_gpu(gpu_ids):
+    """Pool initializer: bind each worker process to its own GPU."""
+    os.environ["CUDA_VISIBLE_DEVICES"] = str(gpu_ids.get())
+
+def make_executor(max_workers=None, gpus=None):
+    """
+    Process pool for variant scoring; each worker loads its own engine/model.
+    
+    Args:
+        max_workers: Worker processes for CPU scoring. Each worker loads its
+            own Enformer, so the default is sized from available RAM
+            (CPU_WORKER_MEMORY_GB each), capped at os.cpu_count()
+        gpus: Optional list of GPU ids; one worker is started per GPU
+    
+    Returns:
+        ProcessPoolExecutor
+    """
+    if gpus:
+        # CUDA can't be used from forked children, so GPU workers are spawned
+        ctx = mp.get_context("spawn")
+        gpu_ids = ctx.Queue()
+        for gpu in gpus:
+            gpu_ids.put(gpu)
+        return ProcessPoolExecutor(max_workers=len(gpus), mp_context=ctx,
+                                   initializer=_pin_gpu, initargs=(gpu_ids,))
+    if max_workers is None:
+        available_gb = psutil.virtual_memory().available / 2**30
+        max_workers = max(1, min(os.cpu_count() or 1, int(available_gb // CPU_WORKER_MEMORY_GB)))
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+def compute_background_for_gene(gene_symbol, variant_count=50, use_enformer=True, executor=None):
     """
     Compute background impact distribution for a gene.
     
@@ -96,6 +146,8 @@ def compute_background_for_gene(gene_symbol, variant_count=50, use_enformer=True
         gene_symbol: Gene symbol
         variant_count: Number of variants to process
         use_enformer: Whether to use Enformer (slow) or heuristic (fast)
+        executor: Process pool to score variants on; a temporary one is
+            created (and shut down) when not given
     
     Returns:
         Dict with distribution data
@@ -113,38 +165,50 @@ def compute_background_for_gene(gene_symbol, variant_count=50, use_enformer=True
     
     print(f"Computing impact for {len(variants)} variants...")
     
-    impacts = []
+    # Variants are independent, so they are scored in parallel; results land
+    # by index to keep the distribution in variant order
+    results = [None] * len(variants)
     failed = 0
     
     start_time = time.time()
     
-    for i, var in enumerate(variants):
-        try:
-            # Compute impact
-            result = compute_variant_impact(
-                chrom=var['chrom'],
-                pos=var['pos'],
-                ref=var['ref'],
-                alt=var['alt']
-            )
-            
-            # Extract max delta (absolute value)
-            max_delta = abs(result['metrics']['max_delta'])
-            impacts.append(max_delta)
+    own_executor = executor is None
+    if own_executor:
+        executor = make_executor()
+    try:
+        futures = {executor.submit(_impact_worker, i, variants[i:i + ENFORMER_BATCH_SIZE]): i
+                   for i in range(0, len(variants), ENFORMER_BATCH_SIZE)}
+        done = 0
+        for future in as_completed(futures):
+            start_idx = futures[future]
+            try:
+                chunk = future.result()
+            except BrokenProcessPool as e:
+                # A worker died (e.g. killed by the OOM killer); record the
+                # chunk as failed and keep going, as the serial loop did
+                end_idx = min(start_idx + ENFORMER_BATCH_SIZE, len(variants))
+                print(f"  Worker crashed on variants {start_idx+1}-{end_idx}: {e}")
+                chunk = [(idx, None) for idx in range(start_idx, end_idx)]
+            for idx, max_delta in chunk:
+                if max_delta is None:
+                    print(f"  Failed variant {idx+1}")
+                    failed += 1
+                else:
+                    results[idx] = max_delta
+            done += len(chunk)
             
             # Progress update
-            if (i + 1) % 10 == 0:
-                elapsed = time.time() - start_time
-                avg_time = elapsed / (i + 1)
-                remaining = avg_time * (len(variants) - i - 1)
-                print(f"  Progress: {i+1}/{len(variants)} | "
-                      f"Avg: {avg_time:.1f}s/variant | "
-                      f"ETA: {remaining/60:.1f}min")
-        
-        except Exception as e:
-            print(f"  Failed variant {i+1}: {e}")
-            failed += 1
-            continue
+            elapsed = time.time() - start_time
+            avg_time = elapsed / done
+            remaining = avg_time * (len(variants) - done)
+            print(f"  Progress: {done}/{len(variants)} | "
+                  f"Avg: {avg_time:.1f}s/variant | "
+                  f"ETA: {remaining/60:.1f}min")
+    finally:
+        if own_executor:
+            executor.shutdown()
+    
+    impacts = [r for r in results if r is not None]
     
     total_time = time.time() - start_time
     
@@ -197,14 +261,35 @@ def main():
     
     results = {}
     
-    for gene in CARDIOVASCULAR_GENES:
-        result = compute_background_for_gene(gene, variant_count=50)
-        
-        if result:
-            results[gene] = result
-        
-        # Small delay between genes
-        time.sleep(1)
+    # One worker per GPU when CUDA is available (each would otherwise load
+    # Enformer onto GPU 0); a CPU pool otherwise
+    gpus = None
+    try:
+        import torch
+        if torch.cuda.is_available():
+            gpus = list(range(torch.cuda.device_count()))
+    except ImportError:
+        pass
+    
+    # One pool for all genes, so each worker loads the engine/model once
+    executor = make_executor(gpus=gpus)
+    try:
+        for gene in CARDIOVASCULAR_GENES:
+            try:
+                result = compute_background_for_gene(gene, variant_count=50, executor=executor)
+            except BrokenProcessPool:
+                # A worker crash breaks the whole pool; start a fresh one for this gene
+                executor.shutdown()
+                executor = make_executor(gpus=gpus)
+                result = compute_background_for_gene(gene, variant_count=50, executor=executor)
+            
+            if result:
+                results[gene] = result
+            
+            # Small delay between genes
+            time.sleep(1)
+    finally:
+        executor.shutdown()
     
     # Save results
     output_path = Path('data/gene_backgrounds.json')
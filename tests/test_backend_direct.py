@@ -65,11 +65,28 @@ def test_system_status_endpoint():
     assert "memory_percent" in data
     print("✅ /system-status endpoint passed")
 
+def test_batch_stream_events():
+    """Test the Server-Sent Events /batch-stream/{id} endpoint."""
+    payload = {"variants": [{"chrom": "chr22", "pos": 36191400, "ref": "A", "alt": "C"},
+                            {"chrom": "chr22", "pos": 36191401, "ref": "A", "alt": "G"}]}
+    batch_id = client.post("/batch-start", json=payload).json()["batch_id"]
+
+    with client.stream("GET", f"/batch-stream/{batch_id}") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [l[7:] for l in response.iter_lines() if l.startswith("event: ")]
+
+    assert events == ["result", "result", "done"]
+    final = client.get(f"/batch-status/{batch_id}").json()
+    assert [r["variant_id"] for r in final["results"]] == ["chr22:36191400:A:C", "chr22:36191401:A:G"]
+    print("✅ /batch-stream SSE endpoint passed")
+
 if __name__ == "__main__":
     try:
         test_variant_impact_endpoint()
         test_gene_annotations_endpoint()
         test_system_status_endpoint()
+        test_batch_stream_events()
         print("\nALL DIRECT BACKEND TESTS PASSED!")
     except Exception as e:
         print(f"\n❌ TEST FAILED: {e}")
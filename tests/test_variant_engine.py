@@ -0,0 +1,73 @@
+import sys
+import os
+import base64
+
+# Add parent directory to path to import variant_engine
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import variant_engine
+from variant_engine import compute_variant_impact, _compute_variant_impact_pure
+
+
+def test_repeat_call_hits_memo():
+    """Re-analysing the same variant reuses the memoized curve and context."""
+    first = compute_variant_impact("chr22", 36191400, "A", "C")
+    hits_before = _compute_variant_impact_pure.cache_info().hits
+    second = compute_variant_impact("chr22", 36191400, "A", "C")
+
+    assert _compute_variant_impact_pure.cache_info().hits == hits_before + 1
+    assert first["metrics"] == second["metrics"]
+    assert first["curve"] == second["curve"]
+    assert first["tracks"] == second["tracks"]
+    assert ("chr22", 36191400, "A", "C", 100) in variant_engine._CONTEXT_CACHE
+    print("✅ Memoization test passed")
+
+
+def test_memoized_curve_is_read_only():
+    """Cached arrays are shared between callers and must not be mutable."""
+    _, x, delta_rna, _ = _compute_variant_impact_pure("chr22", 36191400, "A", "C", 100)
+    assert not x.flags.writeable
+    assert not delta_rna.flags.writeable
+    assert x.dtype == np.int16 and delta_rna.dtype == np.float32
+    print("✅ Read-only curve test passed")
+
+
+def test_enformer_miss_is_not_memoized(monkeypatch):
+    """A None from Enformer (e.g. sequence fetch failed) is retried, not cached."""
+    profile = {"raw_delta": np.linspace(0.0, 1.0, 896), "center_idx": 448, "max_impact": 1.0}
+    calls = []
+
+    def flaky_predict(chrom, pos, ref, alt):
+        calls.append(pos)
+        return None if len(calls) == 1 else profile
+
+    monkeypatch.setattr(variant_engine, "_ENFORMER_RESOLVED", True)
+    monkeypatch.setattr(variant_engine, "_ENFORMER_PREDICT", flaky_predict)
+
+    first = compute_variant_impact("chr22", 36191417, "A", "G")
+    second = compute_variant_impact("chr22", 36191417, "A", "G")
+
+    assert len(calls) == 2
+    assert first["metrics"]["model_used"] == "Heuristic (Simulation)"
+    assert second["metrics"]["model_used"] == "Enformer (Deep Learning)"
+    print("✅ Enformer retry test passed")
+
+
+def test_percentile_ranks_against_background():
+    """Percentile counts background deltas below the variant, out of n + 1."""
+    result = compute_variant_impact("chr22", 36191400, "A", "C")
+    packed = result["background_distribution"]["background_deltas_abs_b64"]
+    bg = np.frombuffer(base64.b64decode(packed), dtype=np.float32)
+    var_delta = result["background_distribution"]["variant_delta"]
+    expected = sum(d < var_delta for d in bg) / (len(bg) + 1) * 100
+    assert result["metrics"]["percentile"] == round(expected, 1)
+    print("✅ Percentile test passed")
+
+
+if __name__ == "__main__":
+    test_repeat_call_hits_memo()
+    test_memoized_curve_is_read_only()
+    test_percentile_ranks_against_background()
+    print("\nALL VARIANT ENGINE TESTS PASSED!")
@@ -157,9 +157,11 @@ def plot_conservation(chrom, pos, window_size=100):
     
     fig, ax = plt.subplots(figsize=(10, 1.5))
     
-    # Area plot
-    ax.fill_between(x, scores, 0, where=(scores>0), color='#27ae60', alpha=0.6, label='Conserved')
-    ax.fill_between(x, scores, 0, where=(scores<0), color='#95a5a6', alpha=0.3, label='Neutral/Accelerated')
+    # Area plot: clip into positive/negative parts once instead of two masked scans
+    x = x.astype(np.float32)
+    scores = scores.astype(np.float32)
+    ax.fill_between(x, np.clip(scores, 0, None), 0, color='#27ae60', alpha=0.6, label='Conserved')
+    ax.fill_between(x, np.clip(scores, None, 0), 0, color='#95a5a6', alpha=0.3, label='Neutral/Accelerated')
     
     # Variant Marker
     ax.axvline(0, color='#e74c3c', linestyle=':', linewidth=2)
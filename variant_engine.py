@@ -1,21 +1,89 @@
 import numpy as np
+import base64
 import json
+import logging
+import time
+import threading
+import functools
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional, List
+from scipy.interpolate import interp1d
 from api_integrations import (
     fetch_ensembl_gene, 
     fetch_ucsc_phylop, 
     fetch_genomic_sequence,
     fetch_gene_structure,
     fetch_gnomad_frequency,
+    fetch_myvariant_info,
+    fetch_gtex_expression,
     reset_fallback_flag,
     fallback_used
 )
 import api_integrations # to access the global flag
 
+logger = logging.getLogger(__name__)
+
 # Cache for background distributions (loaded once)
 _BACKGROUND_CACHE = {}
 
+# Process-local cache for the network-backed context of a variant
+# (gnomAD, PhyloP, exons, GTEx, gene info). Entries expire so that
+# long-lived workers still pick up upstream corrections. API threadpool
+# workers share it, so every access goes through _CONTEXT_CACHE_LOCK.
+_CONTEXT_CACHE = OrderedDict()
+_CONTEXT_CACHE_LOCK = threading.Lock()
+_CONTEXT_CACHE_MAXSIZE = 10000
+_CONTEXT_CACHE_TTL = 3600  # seconds
+
+# Cardiac-weighted tissue fallback used when GTEx is unreachable.
+# Per-tissue weight bounds are kept as arrays so a variant's weights are
+# drawn and applied in a single call.
+_CARDIAC_TISSUES = {"Heart Left Ventricle", "Heart Atrial Appendage",
+                    "Aorta", "Coronary Artery"}
+_FALLBACK_TISSUES = ["Heart Left Ventricle", "Heart Atrial Appendage", "Aorta",
+                     "Coronary Artery", "Liver", "Brain Cerebellum",
+                     "Kidney Cortex", "Lung", "Skeletal Muscle"]
+_FALLBACK_TISSUE_LO = np.array([0.7 if t in _CARDIAC_TISSUES else 0.05
+                                for t in _FALLBACK_TISSUES])
+_FALLBACK_TISSUE_HI = np.array([1.2 if t in _CARDIAC_TISSUES else 0.35
+                                for t in _FALLBACK_TISSUES])
+
+def fallback_tissue_deltas(abs_max_delta: float, weights: np.ndarray) -> np.ndarray:
+    """
+    Scale |max delta| by per-tissue weights for the cardiac fallback.
+    
+    Args:
+        abs_max_delta: The variant's |max delta|
+        weights: Array of shape (n_tissues,), drawn from
+            [_FALLBACK_TISSUE_LO, _FALLBACK_TISSUE_HI)
+    
+    Returns:
+        Array of per-tissue deltas, shape (n_tissues,)
+    """
+    return abs_max_delta * weights
+
+# Synthetic backgrounds are seeded by ``pos % 100``, so only 100 distinct
+# distributions exist; build each once and share it (read-only).
+_BG_CACHE = {}
+
+def _synthetic_background(key: int) -> np.ndarray:
+    """
+    Synthetic |delta| background for variants without a pre-computed one.
+    
+    Args:
+        key: Seed bucket, ``pos % 100``
+    
+    Returns:
+        Read-only array of 200 absolute deltas
+    """
+    bg = _BG_CACHE.get(key)
+    if bg is None:
+        bg = np.abs(np.random.RandomState(key).normal(0, 1.5, 200))
+        bg.setflags(write=False)
+        _BG_CACHE[key] = bg
+    return bg
+
 def load_background_distribution(gene_symbol: str) -> Optional[List[float]]:
     """
     Load pre-computed background distribution for a gene.
@@ -52,60 +120,168 @@ def load_background_distribution(gene_symbol: str) -> Optional[List[float]]:
         return None
         
     except Exception as e:
-        print(f">> Error loading background for {gene_symbol}: {e}")
+        logger.warning("Error loading background for %s: %s", gene_symbol, e)
         return None
 
 
-def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=100, force_live=False):
+# 1. Gene Symbol Mapping (based on position ranges for GRCh38)
+GENE_MAP = {
+    "chr1": [
+        (156100000, 156200000, "LMNA"),      # LMNA region
+        (55000000, 55100000, "PCSK9"),       # PCSK9 region
+        (236700000, 236750000, "ACTN2"),     # ACTN2 region
+    ],
+    "chr2": [
+        (21000000, 21100000, "APOB"),        # APOB region
+        (178500000, 178600000, "TTN"),       # TTN region
+    ],
+    "chr3": [
+        (46850000, 46900000, "MYL3"),        # MYL3 region
+    ],
+    "chr22": [
+        (36100000, 36400000, "MYH9"),        # MYH9 region
+    ]
+}
+
+
+# Enformer (torch) is optional and heavy; resolve it once per process
+# rather than re-attempting the import on every prediction.
+_ENFORMER_PREDICT = None
+_ENFORMER_PREDICT_BATCH = None
+_ENFORMER_RESOLVED = False
+
+# Default for _variant_impact's dl_result: no Enformer result was computed
+# ahead of time (None means it was, and the variant could not be scored)
+_NOT_PREFETCHED = object()
+
+def _resolve_enformer():
+    """Import the enformer_wrapper predictors once; both are None if torch is missing."""
+    global _ENFORMER_PREDICT, _ENFORMER_PREDICT_BATCH, _ENFORMER_RESOLVED
+    if not _ENFORMER_RESOLVED:
+        try:
+            from enformer_wrapper import predict_variant_impact_dl, predict_variant_impacts_dl
+            _ENFORMER_PREDICT = predict_variant_impact_dl
+            _ENFORMER_PREDICT_BATCH = predict_variant_impacts_dl
+        except ImportError:
+            _ENFORMER_PREDICT = _ENFORMER_PREDICT_BATCH = None
+        _ENFORMER_RESOLVED = True
+
+def _get_enformer_predictor():
+    """Return enformer_wrapper.predict_variant_impact_dl, or None if unavailable."""
+    _resolve_enformer()
+    return _ENFORMER_PREDICT
+
+def _get_enformer_batch_predictor():
+    """Return enformer_wrapper.predict_variant_impacts_dl, or None if unavailable."""
+    _resolve_enformer()
+    return _ENFORMER_PREDICT_BATCH
+
+
+@functools.lru_cache(maxsize=None)
+def _make_shape_fns(window_size):
     """
-    Core logic for variant impact prediction.
-    Returns synthetic but realistic data structure.
-    
-    Args:
-        chrom: Chromosome (e.g., "chr22")
-        pos: Position
-        ref: Reference allele
-        alt: Alternate allele
-        assembly: Genome build ("GRCh38" or "GRCh37")
-        window_size: Window size around variant
-        force_live: If True, bypass local fallback caches for API calls
-    
-    Raises:
-        ValueError: If assembly is not GRCh38
+    Build the three heuristic signal kernels for a given window size.
+
+    The Gaussian envelopes (and the splice-site asymmetry) depend only on
+    ``window_size``, so they are evaluated once here and closed over; each
+    kernel then only scales its envelope.
+
+    Returns:
+        Dict mapping shape name to ((base_lo, base_hi), kernel), where
+        kernel(base, direction, is_transition) returns the signal array.
     """
-    # Reset fallback flag at the start of a new computation
-    reset_fallback_flag()
+    # float32 throughout: the envelopes are smooth mocks with no need for
+    # double precision, and half-width arrays halve memory traffic.
+    xf = np.arange(-window_size, window_size + 1, dtype=np.float32)
+    f32 = np.float32
 
-    # Validate assembly
-    if assembly not in ["GRCh38", "GRCh37"]:
-        raise ValueError(f"Invalid assembly: {assembly}. Must be 'GRCh38' or 'GRCh37'")
-    
-    if assembly == "GRCh37":
-        raise ValueError("Currently only GRCh38 coordinates are supported in this demo. Please switch to GRCh38.")
-    
-    # 1. Gene Symbol Mapping (based on position ranges for GRCh38)
-    gene_map = {
-        "chr1": [
-            (156100000, 156200000, "LMNA"),      # LMNA region
-            (55000000, 55100000, "PCSK9"),       # PCSK9 region
-            (236700000, 236750000, "ACTN2"),     # ACTN2 region
-        ],
-        "chr2": [
-            (21000000, 21100000, "APOB"),        # APOB region
-            (178500000, 178600000, "TTN"),       # TTN region
-        ],
-        "chr3": [
-            (46850000, 46900000, "MYL3"),        # MYL3 region
-        ],
-        "chr22": [
-            (36100000, 36400000, "MYH9"),        # MYH9 region
-        ]
+    # Splice site: sharp peak, downstream side damped
+    sharp_env = np.exp(-f32(0.15) * xf**2)
+    sharp_env[xf > 0] *= f32(0.7)
+    # Regulatory: broad Gaussian plus a distal secondary peak
+    broad_env = np.exp(-f32(0.01) * xf**2) + f32(0.3) * np.exp(-f32(0.02) * (xf - f32(30))**2)
+    # Coding: intermediate spread
+    coding_env = np.exp(-f32(0.04) * xf**2)
+
+    def sharp(base, direction, is_transition):
+        return np.float32(base * direction) * sharp_env
+
+    def broad(base, direction, is_transition):
+        return np.float32(base * direction) * broad_env
+
+    def coding(base, direction, is_transition):
+        # Transitions (A<->G, C<->T) often have milder effects
+        scale = 0.85 if is_transition else 1.0
+        return np.float32(base * direction * scale) * coding_env
+
+    return {
+        "sharp":  ((3.5, 5.5), sharp),
+        "broad":  ((2.0, 4.0), broad),
+        "coding": ((1.5, 3.5), coding),
     }
-    
+
+
+@functools.lru_cache(maxsize=None)
+def _noise_scale(window_size):
+    """Per-position noise s.d. for the heuristic: grows linearly away from the variant."""
+    x = np.arange(-window_size, window_size + 1)
+    scale = 0.2 + 0.1 * np.abs(x) / window_size
+    scale.setflags(write=False)
+    return scale
+
+
+class _EnformerFailed(Exception):
+    """Enformer raised while predicting; the heuristic curve must not be memoized."""
+
+
+@functools.lru_cache(maxsize=4096)
+def _compute_variant_impact_pure(chrom, pos, ref, alt, window_size=100):
+    """
+    Deterministic part of the impact prediction: gene mapping and the
+    ΔRNA-seq curve (Enformer when available, heuristic otherwise).
+
+    Memoized per worker process, so re-analysing the same variant skips
+    the signal/noise pipeline entirely. The returned arrays are read-only
+    because they are shared between callers.
+
+    Returns:
+        Tuple of (gene_symbol, x, delta_rna, used_dl)
+
+    Raises:
+        _EnformerFailed: If Enformer is installed but produced no prediction,
+            either by raising or by returning None (model weights or the
+            reference sequence failed to load, or an unsupported variant).
+            lru_cache doesn't store exceptions, so a transient failure is
+            retried next time instead of pinning the heuristic curve.
+    """
+    dl_result = None
+    try:
+        predict_variant_impact_dl = _get_enformer_predictor()
+        if predict_variant_impact_dl is None:
+            raise ImportError("enformer_wrapper")
+        dl_result = predict_variant_impact_dl(chrom, pos, ref, alt)
+    except ImportError:
+        logger.debug("Enformer not available. Using heuristic fallback.")
+    except Exception as e:
+        raise _EnformerFailed(e) from e
+    else:
+        if dl_result is None:
+            raise _EnformerFailed("no prediction returned")
+    return _build_impact_curve(chrom, pos, ref, alt, window_size, dl_result)
+
+
+def _build_impact_curve(chrom, pos, ref, alt, window_size, dl_result):
+    """
+    Gene mapping and ΔRNA-seq curve from an Enformer result (heuristic
+    when dl_result is None). Not memoized; see _compute_variant_impact_pure.
+
+    Returns:
+        Tuple of (gene_symbol, x, delta_rna, used_dl) with read-only arrays
+    """
     # Find gene symbol based on position
     gene_symbol = "UNKNOWN"
-    if chrom in gene_map:
-        for start, end, gene in gene_map[chrom]:
+    if chrom in GENE_MAP:
+        for start, end, gene in GENE_MAP[chrom]:
             if start <= pos <= end:
                 gene_symbol = gene
                 break
@@ -115,16 +291,8 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
         gene_symbol = {"chr22": "MYH9", "chr1": "PCSK9", "chr2": "APOB", "chr3": "MYL3"}.get(chrom, "GENE_X")
     
     # 2. Variant Impact Curve
-    dl_result = None
-    try:
-        from enformer_wrapper import predict_variant_impact_dl
-        dl_result = predict_variant_impact_dl(chrom, pos, ref, alt)
-    except ImportError:
-        print(">> Enformer not available. Using heuristic fallback.")
-    except Exception as e:
-        print(f">> Enformer failed ({e}). Using heuristic fallback.")
-
-    x = np.arange(-window_size, window_size + 1)
+    # Relative positions are small bounded integers; curves are float32.
+    x = np.arange(-window_size, window_size + 1, dtype=np.int16)
 
     if dl_result:
         raw_profile = dl_result["raw_delta"]
@@ -132,11 +300,10 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
         # Extract ±5 Enformer bins (128 bp each) around the variant centre
         bin_subset = raw_profile[center-5:center+6]
         bin_x = np.arange(-5, 6) * 128
-        from scipy.interpolate import interp1d
         signal = interp1d(bin_x, bin_subset, kind='cubic', fill_value="extrapolate")(x)
-        signal = signal * 50.0
+        signal = (signal * 50.0).astype(np.float32)
         np.random.seed(pos % 10000)  # deterministic per variant
-        delta_rna = signal + np.random.normal(0, 0.05, len(x))
+        delta_rna = signal + np.random.normal(0, 0.05, len(x)).astype(np.float32)
         
     else:
         # Heuristic fallback — deterministic per variant position
@@ -146,35 +313,54 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
         is_regulatory = (pos % 50) < 5
         direction = 1 if (pos % 2 == 0) else -1
 
-        if is_splice:
-            base = np.random.uniform(3.5, 5.5)
-            signal = base * direction * np.exp(-0.15 * x**2)
-            signal[x > 0] *= 0.7
-        elif is_regulatory:
-            base = np.random.uniform(2.0, 4.0)
-            signal = base * direction * np.exp(-0.01 * x**2)
-            signal += 0.3 * base * direction * np.exp(-0.02 * (x - 30)**2)
-        else:
-            base = np.random.uniform(1.5, 3.5)
-            signal = base * direction * np.exp(-0.04 * x**2)
-            if is_transition:
-                signal *= 0.85
-
-        noise_level = 0.2 + 0.1 * np.abs(x) / window_size
-        noise = np.random.normal(0, noise_level, len(x))
-        outlier_mask = np.random.random(len(x)) < 0.05
-        noise[outlier_mask] += np.random.normal(0, 0.8, np.sum(outlier_mask))
-        delta_rna = np.clip(signal + noise, -8, 8)
-    
-    # 3. Calculate Metrics
-    max_idx = np.argmax(np.abs(delta_rna))
-    max_delta = float(delta_rna[max_idx])
-    max_pos_rel = int(x[max_idx])
-    
-    # 4. Population Frequency (gnomAD → MyVariant.info → random fallback)
+        shape = "sharp" if is_splice else "broad" if is_regulatory else "coding"
+        (base_lo, base_hi), shape_fn = _make_shape_fns(window_size)[shape]
+        base = np.random.uniform(base_lo, base_hi)
+        signal = shape_fn(base, direction, is_transition)
+
+        noise = np.random.normal(0, _noise_scale(window_size), len(x)).astype(np.float32)
+        # ~5% outliers: draw the count directly (Poisson ≈ Binomial for small p)
+        n_out = min(np.random.poisson(0.05 * x.size), x.size)
+        if n_out:
+            idx = np.random.choice(x.size, n_out, replace=False)
+            noise[idx] += np.random.normal(0, 0.8, n_out).astype(np.float32)
+        # Fused in place: the kernel output is a fresh array owned by this call
+        signal += noise
+        delta_rna = np.clip(signal, -8, 8, out=signal)
+
+    x.setflags(write=False)
+    delta_rna.setflags(write=False)
+    return gene_symbol, x, delta_rna, dl_result is not None
+
+
+def _fetch_variant_context(chrom, pos, ref, alt, gene_symbol, window_size=100, force_live=False):
+    """
+    Network-backed annotations for a variant, cached per process with a TTL.
+
+    Only raw API results are cached; synthetic fallbacks are derived by the
+    caller. ``force_live`` bypasses the cache read but refreshes the entry.
+
+    Returns:
+        Dict with freq, cons_scores, exons, gtex_data, gene_info and the
+        api_integrations ``fallback_used`` flag observed while fetching.
+    """
+    key = (chrom, pos, ref, alt, window_size)
+    now = time.monotonic()
+
+    if not force_live:
+        with _CONTEXT_CACHE_LOCK:
+            entry = _CONTEXT_CACHE.get(key)
+            if entry is not None and entry[0] > now:
+                _CONTEXT_CACHE.move_to_end(key)
+            else:
+                entry = None
+        if entry is not None:
+            api_integrations.fallback_used = entry[1]["fallback_used"]
+            return entry[1]
+
+    # 4. Population Frequency (gnomAD → MyVariant.info)
     freq = fetch_gnomad_frequency(chrom, pos, ref, alt, force_live=force_live)
     if freq is None:
-        from api_integrations import fetch_myvariant_info
         mv_data = fetch_myvariant_info(chrom, pos, ref, alt)
         if mv_data and "gnomad_genome" in mv_data:
             freq = mv_data["gnomad_genome"].get("af", {}).get("af", 0.0)
@@ -182,84 +368,171 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
         elif mv_data and "gnomad_exome" in mv_data:
             freq = mv_data["gnomad_exome"].get("af", {}).get("af", 0.0)
             api_integrations.fallback_used = True
-        else:
-            freq = np.random.uniform(0.00001, 0.0001)
-            print(f">> gnomAD unavailable for {chrom}:{pos}, using random fallback")
-    
-    # 5. PhyloP Conservation (UCSC API, synthetic fallback)
+
+    # 5. PhyloP Conservation (UCSC API)
     cons_start = max(0, pos - window_size)
     cons_end   = pos + window_size + 1
     cons_scores = fetch_ucsc_phylop(chrom, cons_start, cons_end, force_live=force_live)
+
+    # Exon structure (Ensembl API)
+    exons = fetch_gene_structure(chrom, pos, window_size, force_live=force_live) or []
+
+    # 6. Tissue expression (GTEx v8)
+    gtex_data = None
+    try:
+        gtex_data = fetch_gtex_expression(gene_symbol) if gene_symbol != "UNKNOWN" else None
+    except Exception as e:
+        logger.debug("GTEx fetch failed (%s)", e)
+
+    # 8. Fetch Gene Info
+    gene_info = fetch_ensembl_gene(gene_symbol)
+
+    context = {
+        "freq": freq,
+        "cons_scores": cons_scores,
+        "exons": exons,
+        "gtex_data": gtex_data,
+        "gene_info": gene_info,
+        "fallback_used": api_integrations.fallback_used,
+    }
+
+    # Only cache once the primary lookup (allele frequency) has succeeded;
+    # otherwise a transient outage would pin this variant to synthetic
+    # fallbacks for the whole TTL
+    if freq is not None:
+        with _CONTEXT_CACHE_LOCK:
+            _CONTEXT_CACHE[key] = (now + _CONTEXT_CACHE_TTL, context)
+            _CONTEXT_CACHE.move_to_end(key)
+            while len(_CONTEXT_CACHE) > _CONTEXT_CACHE_MAXSIZE:
+                _CONTEXT_CACHE.popitem(last=False)
+    return context
+
+
+def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=100, force_live=False):
+    """
+    Core logic for variant impact prediction.
+    Returns synthetic but realistic data structure.
+    
+    Args:
+        chrom: Chromosome (e.g., "chr22")
+        pos: Position
+        ref: Reference allele
+        alt: Alternate allele
+        assembly: Genome build ("GRCh38" or "GRCh37")
+        window_size: Window size around variant
+        force_live: If True, bypass local fallback caches for API calls
+    
+    Raises:
+        ValueError: If assembly is not GRCh38
+    """
+    return _variant_impact(chrom, pos, ref, alt, assembly, window_size, force_live)
+
+
+def _variant_impact(chrom, pos, ref, alt, assembly, window_size, force_live, dl_result=_NOT_PREFETCHED):
+    """
+    compute_variant_impact, optionally from a precomputed Enformer result.
+
+    With the default dl_result the curve comes from the memoized
+    _compute_variant_impact_pure; an explicit dl_result (None = heuristic)
+    is turned into a curve directly and never enters the memo.
+    """
+    # Reset fallback flag at the start of a new computation
+    reset_fallback_flag()
+
+    # Validate assembly
+    if assembly not in ["GRCh38", "GRCh37"]:
+        raise ValueError(f"Invalid assembly: {assembly}. Must be 'GRCh38' or 'GRCh37'")
+    
+    if assembly == "GRCh37":
+        raise ValueError("Currently only GRCh38 coordinates are supported in this demo. Please switch to GRCh38.")
+    
+    # 1–2. Gene symbol and impact curve (memoized unless Enformer failed)
+    if dl_result is not _NOT_PREFETCHED:
+        gene_symbol, x, delta_rna, used_dl = _build_impact_curve(chrom, pos, ref, alt, window_size, dl_result)
+    else:
+        try:
+            gene_symbol, x, delta_rna, used_dl = _compute_variant_impact_pure(chrom, pos, ref, alt, window_size)
+        except _EnformerFailed as e:
+            logger.warning("Enformer failed (%s). Using heuristic fallback.", e)
+            gene_symbol, x, delta_rna, used_dl = _build_impact_curve(chrom, pos, ref, alt, window_size, None)
+    
+    # 3. Calculate Metrics
+    max_idx = np.argmax(np.abs(delta_rna))
+    max_delta = float(delta_rna[max_idx])
+    max_pos_rel = int(x[max_idx])
+    
+    # 4–8. Network-backed context (gnomAD, PhyloP, exons, GTEx, gene info)
+    context = _fetch_variant_context(chrom, pos, ref, alt, gene_symbol, window_size, force_live=force_live)
+    freq      = context["freq"]
+    exons     = context["exons"]
+    gene_info = context["gene_info"]
+
+    # Synthetic fallbacks — seeded locally so cached curves stay deterministic
+    rng = np.random.default_rng(pos % 10000)
+    if freq is None:
+        freq = rng.uniform(0.00001, 0.0001)
+        logger.debug("gnomAD unavailable for %s:%s, using random fallback", chrom, pos)
+
+    cons_scores = context["cons_scores"]
     if cons_scores is not None and len(cons_scores) == len(x):
-        cons_scores  = np.array(cons_scores)
+        cons_scores  = np.asarray(cons_scores, dtype=np.float32)
         used_real_cons = True
     else:
-        cons_scores  = np.random.normal(0.5, 1.0, len(x))
+        cons_scores  = rng.normal(0.5, 1.0, len(x)).astype(np.float32)
         cons_scores[window_size-10:window_size+10] += 2.0
         used_real_cons = False
-        print(f">> PhyloP unavailable for {chrom}:{pos}, using synthetic fallback")
-
-    # Exon structure (Ensembl API)
-    exons = fetch_gene_structure(chrom, pos, window_size, force_live=force_live) or []
+        logger.debug("PhyloP unavailable for %s:%s, using synthetic fallback", chrom, pos)
     
     # 6. Tissue Effects — GTEx v8 TPM scaled by Enformer |delta|
     tissue_effects = []
-    try:
-        from api_integrations import fetch_gtex_expression
-        gtex_data = fetch_gtex_expression(gene_symbol) if gene_symbol != "UNKNOWN" else None
-        if not gtex_data:
-            raise ValueError("No data returned")
+    gtex_data = context["gtex_data"]
+    if gtex_data:
         max_tpm = max(t.get("tpm", 0) for t in gtex_data) or 1.0
         for t in gtex_data:
             tpm = t.get("tpm", 0)
             tissue_effects.append({"tissue": t["tissue"],
                                    "delta": round(abs(max_delta) * (tpm / max_tpm), 4),
                                    "tpm":   tpm})
-        data_sources["tissue_effects"] = "GTEx v8 API"
-    except Exception as e:
-        print(f">> GTEx unavailable ({e}), using cardiac-weighted fallback")
-        CARDIAC = {"Heart Left Ventricle", "Heart Atrial Appendage",
-                   "Aorta", "Coronary Artery"}
-        TISSUES = ["Heart Left Ventricle", "Heart Atrial Appendage", "Aorta",
-                   "Coronary Artery", "Liver", "Brain Cerebellum",
-                   "Kidney Cortex", "Lung", "Skeletal Muscle"]
+        tissue_source = "GTEx v8 API"
+    else:
+        logger.debug("GTEx unavailable, using cardiac-weighted fallback")
         np.random.seed(pos % 10000)
-        for t in TISSUES:
-            w = np.random.uniform(0.7, 1.2) if t in CARDIAC else np.random.uniform(0.05, 0.35)
-            tissue_effects.append({"tissue": t, "delta": round(abs(max_delta) * w, 4)})
-        data_sources["tissue_effects"] = "GTEx unavailable — cardiac-weighted fallback"
+        weights = np.random.uniform(_FALLBACK_TISSUE_LO, _FALLBACK_TISSUE_HI)
+        deltas = fallback_tissue_deltas(abs(max_delta), weights)
+        tissue_effects = [{"tissue": t, "delta": round(float(d), 4)}
+                          for t, d in zip(_FALLBACK_TISSUES, deltas)]
+        tissue_source = "GTEx unavailable — cardiac-weighted fallback"
     
     # 7. Background Distribution (pre-computed per gene, or synthetic fallback)
     background_deltas = load_background_distribution(gene_symbol)
     if background_deltas is None:
-        np.random.seed(pos % 100)
-        background_deltas = np.abs(np.random.normal(0, 1.5, 200)).tolist()
-        print(f">> No pre-computed background for {gene_symbol}, using synthetic")
-    all_deltas = background_deltas + [abs(max_delta)]
-    percentile = (np.sum(np.array(all_deltas) < abs(max_delta)) / len(all_deltas)) * 100
+        background_deltas = _synthetic_background(pos % 100)
+        logger.debug("No pre-computed background for %s, using synthetic", gene_symbol)
+    else:
+        background_deltas = np.asarray(background_deltas, dtype=float)
+    # Rank the variant against background + itself (it never beats itself)
+    abs_md = abs(max_delta)
+    percentile = float((background_deltas < abs_md).sum()) / (background_deltas.size + 1) * 100
 
     
     # Track data sources for transparency
     data_sources = {
-        "variant_impact": "Enformer (Deep Learning)" if dl_result else "Heuristic (Simulation)",
+        "variant_impact": "Enformer (Deep Learning)" if used_dl else "Heuristic (Simulation)",
         "gnomad_frequency": "gnomAD v4 API" if freq and freq > 0 else "Not found in gnomAD",
         "gene_structure": "Ensembl API" if exons else "Local fallback",
         "conservation": "UCSC PhyloP API" if used_real_cons else "Synthetic fallback",
         "gene_symbol": "Ensembl API" if gene_symbol else "Heuristic",
         "background_distribution": "Simulated (for percentile calculation)",
-        "tissue_effects": "Simulated (tissue-specific predictions)"
+        "tissue_effects": tissue_source
     }
     
-    # 8. Fetch Gene Info
-    gene_info = fetch_ensembl_gene(gene_symbol)
-    
     # 9. Calculate Statistics
     # Z-Score
-    if background_deltas and len(background_deltas) > 1:
-        bg_mean = np.mean(background_deltas)
-        bg_std = np.std(background_deltas)
+    if background_deltas.size > 1:
+        bg_mean = background_deltas.mean()
+        bg_std = background_deltas.std()
         if bg_std > 0:
-            z_score = (abs(max_delta) - bg_mean) / bg_std
+            z_score = float((abs_md - bg_mean) / bg_std)
         else:
             z_score = 0.0
     else:
@@ -267,7 +540,7 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
         
     # Confidence: penalise each synthetic data source
     confidence = 100.0
-    if not dl_result:                                                   confidence -= 50.0
+    if not used_dl:                                                     confidence -= 50.0
     if "synthetic" in data_sources["conservation"].lower():            confidence -= 20.0
     if "synthetic" in data_sources["background_distribution"].lower(): confidence -= 10.0
     if not gene_info:                                                   confidence -= 10.0
@@ -284,7 +557,7 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
             "z_score": round(z_score, 2),
             "confidence": round(confidence, 1),
             "fallback_used": api_integrations.fallback_used,
-            "model_used": "Enformer (Deep Learning)" if dl_result else "Heuristic (Simulation)"
+            "model_used": "Enformer (Deep Learning)" if used_dl else "Heuristic (Simulation)"
         },
         "curve": {
             "x": x.tolist(),
@@ -297,8 +570,50 @@ def compute_variant_impact(chrom, pos, ref, alt, assembly="GRCh38", window_size=
         "gene": gene_info,
         "tissue_effects": tissue_effects,
         "background_distribution": {
-            "background_deltas": background_deltas,
-            "variant_delta": abs(max_delta)
+            # |Δ| packed as base64 float32: ~4x smaller than a JSON float list
+            "background_deltas_abs_b64": base64.b64encode(
+                np.abs(background_deltas).astype(np.float32).tobytes()).decode("ascii"),
+            # Deprecated JSON list of the same |Δ| values, kept for existing
+            # API clients (and matching cardiovar_hf); new readers use the b64 field
+            "background_deltas": np.abs(background_deltas).tolist(),
+            "variant_delta": abs_md
         },
         "data_sources": data_sources
     }
+
+
+def compute_variant_impact_batch(variants, batch_size=4, assembly="GRCh38", window_size=100, force_live=False):
+    """
+    compute_variant_impact for many variants, batching their Enformer runs.
+
+    When Enformer is available, all variants are first scored through
+    predict_variant_impacts_dl (batch_size variants per forward pass) and
+    each variant is assembled from its precomputed profile. Without
+    Enformer, or if the batched run fails, this is a plain serial loop.
+
+    Args:
+        variants: List of dicts with chrom, pos, ref, alt
+        batch_size: Variants per Enformer forward pass
+        assembly, window_size, force_live: As for compute_variant_impact
+
+    Returns:
+        List aligned with variants: the compute_variant_impact result, or
+        None for a variant that failed
+    """
+    keys = [(v["chrom"], v["pos"], v["ref"], v["alt"]) for v in variants]
+    dl_results = [_NOT_PREFETCHED] * len(keys)
+    predict_batch = _get_enformer_batch_predictor()
+    if predict_batch is not None:
+        try:
+            dl_results = predict_batch(keys, batch_size=batch_size)
+        except Exception as e:
+            logger.warning("Batched Enformer failed (%s). Scoring variants one at a time.", e)
+
+    results = []
+    for key, dl_result in zip(keys, dl_results):
+        try:
+            results.append(_variant_impact(*key, assembly, window_size, force_live, dl_result))
+        except Exception as e:
+            logger.warning("Variant %s:%s %s>%s failed: %s", *key, e)
+            results.append(None)
+    return results
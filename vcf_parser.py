@@ -1,6 +1,21 @@
 import io
 import pandas as pd
 
+# Typed batch columns: no per-column inference, string columns stay Arrow/NA-backed
+BATCH_DTYPES = {"chrom": "string", "pos": "int64", "ref": "string", "alt": "string"}
+
+def read_batch_csv(file) -> pd.DataFrame:
+    """
+    Read an uploaded batch CSV with typed chrom, pos, ref, alt columns.
+    Uses the multithreaded pyarrow parser when pyarrow is installed, and
+    falls back to the default parser otherwise (``file`` must be seekable).
+    """
+    try:
+        return pd.read_csv(file, engine="pyarrow", dtype=BATCH_DTYPES)
+    except ImportError:
+        file.seek(0)
+        return pd.read_csv(file, dtype=BATCH_DTYPES)
+
 def parse_vcf(file_content: str) -> pd.DataFrame:
     """
     Parse a VCF file string into a pandas DataFrame with chrom, pos, ref, alt.